@@ -0,0 +1,176 @@
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+import config  # loads the .env file (once per process)
+from rate_limiter import get_limiter
+from metrics import metrics
+from circuit_breaker import guarded
+from deadline import run_deadline
+
+# Base URL of the Amadeus API (can point to a local fake server, see fake_api_server.py)
+AMADEUS_URL = os.getenv("AMADEUS_URL", "https://test.api.amadeus.com")
+
+# Amadeus authentication endpoint
+TOKEN_END = f"{AMADEUS_URL}/v1/security/oauth2/token"
+
+# Refresh the token this many seconds before it really expires
+TOKEN_MARGIN = 60
+
+# Retry settings for 429 (too many requests) and 5xx (server errors)
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5  # seconds, doubled on every retry
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# One pooled session for all Amadeus clients, so connections (and TLS) are reused
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=20))
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=20))
+
+
+class AmadeusClient:
+    """
+    Shared client for the Amadeus API. It handles:
+      - Getting and refreshing the access token (based on `expires_in`)
+      - Sending requests through one pooled session (keep-alive)
+      - One retry with a new token when a request returns 401
+      - Exponential backoff on 429/5xx, honoring the `Retry-After` header
+      - Waiting on the shared Amadeus rate limiter before each request
+      - Connect/read timeouts and a circuit breaker per endpoint (see circuit_breaker.py)
+    """
+
+    def __init__(self, client_id, client_secret):
+        self.session = _session
+        self.limiter = get_limiter("amadeus")
+
+        # Payload for token request
+        self.auth_header = {"Content-Type": "application/x-www-form-urlencoded"}
+        self.post_params = {
+            "grant_type": "client_credentials",
+            "client_id": client_id,
+            "client_secret": client_secret
+        }
+
+        # Token and the moment (time.monotonic) when it stops being valid
+        self.access_token = None
+        self.expires_at = 0
+        self.token_lock = threading.Lock()
+
+    def get_token(self, force=False):
+        """
+        Returns a valid access token.
+        A new token is requested when there is none, when it is about to expire,
+        or when `force` is True (e.g. after a 401 response).
+        Returns None if the token request fails.
+        """
+        with self.token_lock:
+            if not force and self.access_token is not None and time.monotonic() < self.expires_at:
+                return self.access_token
+
+            try:
+                response = guarded("token", lambda timeout: metrics.timed("token", lambda: self.session.post(
+                    url=TOKEN_END, headers=self.auth_header, data=self.post_params, timeout=timeout
+                )))
+                response.raise_for_status()
+                data = response.json()
+                self.access_token = data["access_token"]
+                # Amadeus tokens live about 30 minutes (expires_in = 1799)
+                self.expires_at = time.monotonic() + data.get("expires_in", 1799) - TOKEN_MARGIN
+                return self.access_token
+            except Exception as error:
+                print(f"Token request failed: {error}")
+                self.access_token = None
+                return None
+
+    def get(self, url, params=None, headers=None, endpoint="amadeus", stream=False):
+        """
+        Sends a GET request to the Amadeus API with authorization, retries and backoff.
+        `endpoint` is the name used in metrics (e.g. "flight_offers").
+        With stream=True the body is read by the caller (see response_parsing).
+        Returns the final requests.Response (the caller checks the status).
+        """
+        return self.request("GET", url, params=params, headers=headers, endpoint=endpoint, stream=stream)
+
+    def request(self, method, url, params=None, headers=None, endpoint="amadeus", stream=False):
+        """
+        Sends a request to the Amadeus API.
+        - 401 → refresh the token once and try again
+        - 429/5xx/connection error/timeout → wait (Retry-After or exponential backoff) and try again,
+          unless the wait would end after the run deadline
+        - endpoint's circuit open → CircuitOpenError at once (no request, no retry)
+        """
+        token_refreshed = False
+        attempt = 0
+
+        while True:
+            request_headers = dict(headers or {})
+            request_headers["Authorization"] = f"Bearer {self.get_token()}"
+
+            def send(timeout):
+                # Requests skipped by an open circuit don't use up the rate limit
+                self.limiter.acquire()
+                return metrics.timed(endpoint, lambda: self.session.request(
+                    method, url, params=params, headers=request_headers, stream=stream, timeout=timeout
+                ), stream=stream)
+
+            try:
+                response = guarded(endpoint, send)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                # Give up when out of retries or when the backoff would end after the run deadline
+                if attempt >= MAX_RETRIES or not run_deadline.sleep(BACKOFF_BASE * 2 ** attempt):
+                    raise
+                metrics.record_retry(endpoint)
+                attempt += 1
+                continue
+
+            # Token expired or was revoked — get a new one and retry once
+            if response.status_code == 401 and not token_refreshed:
+                response.close()
+                token_refreshed = True
+                metrics.record_retry(endpoint)
+                self.get_token(force=True)
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+                delay = self._retry_delay(response, attempt)
+                remaining = run_deadline.remaining()
+                # A wait (e.g. Retry-After: 600) that ends after the run deadline → return this response
+                if remaining is None or delay < remaining:
+                    response.close()
+                    metrics.record_retry(endpoint)
+                    run_deadline.sleep(delay)
+                    attempt += 1
+                    continue
+
+            return response
+
+    @staticmethod
+    def _retry_delay(response, attempt):
+        """
+        Returns how long to wait before the next attempt.
+        Uses the `Retry-After` header (in seconds) when the API sends it.
+        """
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                return max(float(retry_after), 0)
+            except ValueError:
+                pass
+        return BACKOFF_BASE * 2 ** attempt
+
+
+# One client per set of credentials, shared by FlightData and Hotel
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(client_id, client_secret):
+    """
+    Returns the shared AmadeusClient for the given credentials.
+    """
+    with _clients_lock:
+        key = (client_id, client_secret)
+        if key not in _clients:
+            _clients[key] = AmadeusClient(client_id, client_secret)
+        return _clients[key]
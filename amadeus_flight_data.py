@@ -1,21 +1,31 @@
 import os
-from dotenv import load_dotenv
-import requests
 from datetime import datetime, timedelta
-import time
-
-# Load environment variables from .env file
-load_dotenv()
+from concurrent.futures import ThreadPoolExecutor
+import config  # loads the .env file (once per process)
+from amadeus_client import get_client, AMADEUS_URL
+from cache_store import get_store
+from response_parsing import read_items, FlightOffer
+from circuit_breaker import CircuitOpenError
+from deadline import run_deadline, DeadlineExceeded
 
 # API credentials
 FLIGHT_KEY = os.getenv("FLIGHT_DATA_KEY")
 FLIGHT_SECRET = os.getenv("FLIGHT_DATA_SECRET")
 
 # Amadeus API endpoints
-IATA_ENDPOINT = "https://test.api.amadeus.com/v1/reference-data/locations/cities"
-FLIGHT_SRC_END = "https://test.api.amadeus.com/v2/shopping/flight-offers"
-ORIGIN_DESTINATION = "BEG"  # Origin airport (Belgrade)
-LOCATION_END = "https://test.api.amadeus.com/v1/reference-data/locations"
+IATA_ENDPOINT = f"{AMADEUS_URL}/v1/reference-data/locations/cities"
+FLIGHT_SRC_END = f"{AMADEUS_URL}/v2/shopping/flight-offers"
+ORIGIN_DESTINATION = "BEG"  # Default origin airport (Belgrade)
+
+# All origin airports to search from, e.g. FLIGHT_ORIGINS=BEG,INI,NIS
+ORIGINS = [code.strip().upper() for code in os.getenv("FLIGHT_ORIGINS", ORIGIN_DESTINATION).split(",") if code.strip()]
+LOCATION_END = f"{AMADEUS_URL}/v1/reference-data/locations"
+
+# Reference data (IATA codes, coordinates) rarely changes, so it is cached for a long time
+IATA_TTL = 90 * 24 * 3600
+# Cities the API doesn't know are looked up again after a week
+IATA_NOT_FOUND_TTL = 7 * 24 * 3600
+COORDINATE_TTL = 90 * 24 * 3600
 
 
 class FlightData:
@@ -28,19 +38,13 @@ class FlightData:
     """
 
     def __init__(self):
-        # Endpoint for authentication
-        self.flight_post = "https://test.api.amadeus.com/v1/security/oauth2/token"
-
-        # Headers and payload for token request
-        self.auth_header = {"Content-Type": "application/x-www-form-urlencoded"}
-        self.post_params = {
-            "grant_type": "client_credentials",
-            "client_id": FLIGHT_KEY,
-            "client_secret": FLIGHT_SECRET
-        }
+        # Shared Amadeus client (pooled session, token refresh, retries, rate limit)
+        self.client = get_client(FLIGHT_KEY, FLIGHT_SECRET)
+
+        # Persistent cache for reference data
+        self.cache = get_store()
 
-        # Store token and date variables
-        self.access_token = None
+        # Date variables (updated by search_dates, so a long-running process moves on with the calendar)
         self.today = datetime.now()
         self.tomorrow = self.today + timedelta(days=1)
         self.future = None
@@ -48,51 +52,52 @@ class FlightData:
     def get_access_token(self):
         """
         Requests an access token from the Amadeus API.
-        The token is stored in the instance to prevent multiple requests.
+        The client keeps the token and refreshes it shortly before it expires.
         """
-        if self.access_token is not None:
-            return self.access_token
-
-        try:
-            response = requests.post(
-                url=self.flight_post,
-                headers=self.auth_header,
-                data=self.post_params
-            )
-            response.raise_for_status()
-            self.access_token = response.json()["access_token"]
-            return self.access_token
-        except Exception as error:
-            print(f"Token request failed: {error}")
-            return None
+        return self.client.get_token()
 
     def get_iata_codes(self, city):
         """
         Returns the IATA code for a given city name.
+        The code is read from the local cache when possible.
         If the city is not found, returns None.
+        "Not found" is cached too (for IATA_NOT_FOUND_TTL); failed requests are not.
+        """
+        code = self.cache.get_or_fetch(
+            "iata", city.upper(), lambda: self._fetch_iata_code(city), ttl=IATA_TTL, empty_ttl=IATA_NOT_FOUND_TTL
+        )
+        return code or None
+
+    def _fetch_iata_code(self, city):
+        """
+        Requests the IATA code for a city from the Amadeus API.
+        Returns "" when the API doesn't know the city, None when the request failed.
         """
         iata_params = {"keyword": city, "max": 1}
-        auth_header = {"Authorization": f"Bearer {self.access_token}"}
 
         try:
-            response = requests.get(url=IATA_ENDPOINT, params=iata_params, headers=auth_header)
+            response = self.client.get(url=IATA_ENDPOINT, params=iata_params, endpoint="iata")
             response.raise_for_status()
             data = response.json()
 
             if "data" in data and len(data["data"]) > 0:
-                return data["data"][0].get("iataCode")
+                return data["data"][0].get("iataCode") or ""
             else:
-                return None
+                return ""
         except Exception as e:
             print(f"Error fetching IATA code for {city}: {e}")
             return None
 
-    def search_for_flights(self, des_code, price, days):
+    def search_for_flights(self, des_code, price, days, max_workers=7, dates=None, origins=None):
         """
-        Searches for available flights from Belgrade (BEG) to a destination city.
+        Searches for available flights from Belgrade (BEG), or other origins, to a destination city.
         - des_code: Destination IATA code
         - price: Maximum price limit
         - days: Number of days to search ahead from tomorrow
+        - max_workers: How many days are searched at the same time
+        - dates: Optional list of departure dates to search instead of the whole window
+          (e.g. only dates with good weather, see DatePlanner)
+        - origins: Optional list of origin airports (default: [ORIGIN_DESTINATION])
 
         Returns a list of flights with:
           - airport: destination airport code
@@ -100,66 +105,124 @@ class FlightData:
           - departureTime: time of departure
           - price: total price
           - cityCode: destination city code
+          - origin: origin airport code
+        """
+        dates_by_code = {des_code: dates} if dates is not None else None
+        return self.search_many([(des_code, price)], days, max_workers, dates_by_code, origins)[des_code]
+
+    def search_many(self, destinations, days, max_workers=10, dates_by_code=None, origins=None):
+        """
+        Searches flights for many destinations (and origins) at once.
+        All (origin, destination, day) queries run in a thread pool and share
+        one rate limiter, so we never go over the Amadeus request limit.
+        - destinations: list of (des_code, price) pairs
+        - days: Number of days to search ahead from tomorrow
+        - max_workers: How many requests can be in flight at the same time
+        - dates_by_code: Optional {des_code: list of dates} to search only those dates
+        - origins: Optional list of origin airports (default: [ORIGIN_DESTINATION])
+
+        Returns a dict {des_code: list of flights}, flights sorted by date and origin
+        (same format as search_for_flights).
         """
+        origins = origins or [ORIGIN_DESTINATION]
+        dates = self.search_dates(days)
+        results = {des_code: [] for des_code, price in destinations}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            jobs = [
+                (des_code, executor.submit(self.search_day, des_code, price, date, origin))
+                for des_code, price in destinations
+                for date in (dates_by_code.get(des_code, dates) if dates_by_code else dates)
+                for origin in origins
+            ]
+
+            # Jobs are collected in submit order, so flights stay sorted by date
+            for des_code, job in jobs:
+                try:
+                    flight = job.result()
+                except DeadlineExceeded:
+                    # The flights found so far are still returned
+                    run_deadline.skip("flight searches")
+                    continue
+                if flight is not None:
+                    results[des_code].append(flight)
+
+        return results
+
+    def search_dates(self, days):
+        """
+        Returns the departure dates to search: from tomorrow up to `days` days from today.
+        "Today" is read on every call, so the daemon gets new dates after midnight.
+        """
+        self.today = datetime.now()
+        self.tomorrow = self.today + timedelta(days=1)
         self.future = self.today + timedelta(days=days)
+        dates = []
         current_date = self.tomorrow
-        about_flight = []
-
         while current_date < self.future:
-            auth_header = {
-                "accept": "application/vnd.amadeus+json",
-                "Authorization": f"Bearer {self.access_token}"
-            }
-            params = {
-                "originLocationCode": ORIGIN_DESTINATION,
-                "destinationLocationCode": des_code,
-                "departureDate": current_date.strftime("%Y-%m-%d"),
-                "adults": 1,
-                "maxPrice": price,
-                "max": 1
-            }
-
-            try:
-                response = requests.get(url=FLIGHT_SRC_END, headers=auth_header, params=params)
-                response.raise_for_status()
-                data = response.json()
-
-                if data.get("data"):
-                    flight = data["data"][0]
-                    segments = flight["itineraries"][0]["segments"]
-
-                    # Extract flight information
-                    departure_at = segments[0]["departure"]["at"].split("T")
-                    arrival_place = segments[-1]["arrival"]["iataCode"]
-                    total_price = flight["price"]["grandTotal"]
-                    city_code = des_code
-
-                    about_flight.append({
-                        "airport": arrival_place,
-                        "departureDate": departure_at[0],
-                        "departureTime": departure_at[1],
-                        "price": total_price,
-                        "cityCode": city_code
-                    })
-
-            except Exception as e:
-                print(f"Error searching flights on {current_date}: {e}")
-
-            # Move to the next day and avoid hitting the API too frequently
+            dates.append(current_date)
             current_date += timedelta(days=1)
-            time.sleep(0.2)
+        return dates
+
+    def search_day(self, des_code, price, date, origin=ORIGIN_DESTINATION, raise_errors=False):
+        """
+        Searches for the cheapest flight from an origin to a destination on one day.
+        Returns a flight dict or None if nothing was found.
+        A failed search also returns None, unless `raise_errors` is True (the pipeline
+        uses that, so a failure is never stored or archived as "no flight").
+        """
+        auth_header = {"accept": "application/vnd.amadeus+json"}
+        params = {
+            "originLocationCode": origin,
+            "destinationLocationCode": des_code,
+            "departureDate": date.strftime("%Y-%m-%d"),
+            "adults": 1,
+            "maxPrice": price,
+            "max": 1
+        }
 
-        return about_flight
+        try:
+            response = self.client.get(
+                url=FLIGHT_SRC_END, headers=auth_header, params=params, endpoint="flight_offers", stream=True
+            )
+            response.raise_for_status()
+
+            # Only the first offer is needed; the rest of the response is not decoded
+            items = read_items(response, "data", limit=1)
+            if items:
+                return FlightOffer.from_item(items[0]).as_dict(des_code, origin)
+
+        except DeadlineExceeded:
+            # Reported as skipped work by the pipeline
+            raise
+        except CircuitOpenError:
+            # Counted by the breaker and reported at the end of the run
+            if raise_errors:
+                raise
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"Error searching flights {origin}→{des_code} on {date}: {e}")
+
+        return None
 
     def get_coordinate(self, airport):
         """
         Retrieves coordinates (latitude/longitude) for a specific airport or city.
+        The response is read from the local cache when possible.
+        """
+        return self.cache.get_or_fetch(
+            "coordinates", airport.upper(), lambda: self._fetch_coordinate(airport), ttl=COORDINATE_TTL
+        )
+
+    def _fetch_coordinate(self, airport):
+        """
+        Requests location data for an airport or city from the Amadeus API.
         """
-        auth_header = {"Authorization": f"Bearer {self.access_token}"}
         params = {"subType": "AIRPORT,CITY", "keyword": airport}
 
         try:
-            response = requests.get(url=LOCATION_END, headers=auth_header, params=params)
+            response = self.client.get(url=LOCATION_END, params=params, endpoint="coordinates")
             response.raise_for_status()
             data = response.json()
             return data
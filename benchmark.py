@@ -0,0 +1,99 @@
+# --- Offline end-to-end benchmark ---
+# Runs the real main.py flow against fake_api_server.py (no API accounts needed)
+# and reports wall-clock time, requests per endpoint and peak memory for each scale.
+# Usage: python benchmark.py --scales 10 100 1000 --latency 20 --error-rate 0.02
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import fake_api_server
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_scale(destinations, latency, error_rate, amadeus_rate, extra_args):
+    """
+    Runs main.py once for `destinations` generated cities with empty caches.
+    Returns a dict with the results.
+    """
+    server, api = fake_api_server.start(destinations, latency=latency, error_rate=error_rate)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        env = dict(os.environ)
+        env.update(fake_api_server.environment(server))
+        env.update({
+            "AMADEUS_RATE": str(amadeus_rate),
+            "CACHE_DB": os.path.join(work_dir, "cache.sqlite"),
+            "STATE_DB": os.path.join(work_dir, "state.sqlite"),
+            "SHEET_SNAPSHOT": os.path.join(work_dir, "sheet_snapshot.json"),
+        })
+        log_path = os.path.join(work_dir, "main.log")
+
+        with open(log_path, "w", encoding="utf-8") as log:
+            start = time.perf_counter()
+            process = subprocess.Popen(
+                [sys.executable, os.path.join(PROJECT_DIR, "main.py")] + extra_args,
+                cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT
+            )
+            # wait4 gives the resource usage of this child only (ru_maxrss is in KB on Linux)
+            _, status, usage = os.wait4(process.pid, 0)
+            wall_time = time.perf_counter() - start
+
+        with open(log_path, encoding="utf-8") as log:
+            output = log.read()
+
+    server.shutdown()
+    server.server_close()
+
+    return {
+        "destinations": destinations,
+        "exit_code": os.waitstatus_to_exitcode(status),
+        "wall_time": round(wall_time, 3),
+        "peak_memory_mb": round(usage.ru_maxrss / 1024, 1),
+        "requests": dict(sorted(api.counts.items())),
+        "total_requests": sum(api.counts.values()),
+        "injected_429": sum(api.errors.values()),
+        "output_tail": output.splitlines()[-5:],
+    }
+
+
+def print_result(result):
+    print(f"\n=== {result['destinations']} destinations ===")
+    print(f"Wall time:     {result['wall_time']} s")
+    print(f"Peak memory:   {result['peak_memory_mb']} MB")
+    print(f"Requests:      {result['total_requests']} ({result['injected_429']} answered with 429)")
+    for name, count in result["requests"].items():
+        print(f"  {name:<14} {count}")
+    if result["exit_code"] != 0:
+        print(f"main.py exited with code {result['exit_code']}:")
+        for line in result["output_tail"]:
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of the main.py flow.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100, 1000],
+                        help="numbers of destinations to run")
+    parser.add_argument("--latency", type=float, default=20,
+                        help="latency added to every fake response (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="share of Amadeus requests answered with 429")
+    parser.add_argument("--amadeus-rate", type=float, default=200,
+                        help="Amadeus requests per second allowed by the rate limiter")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    parser.add_argument("main_args", nargs="*", help="extra arguments for main.py (after --)")
+    args = parser.parse_args()
+
+    results = []
+    for scale in args.scales:
+        result = run_scale(scale, args.latency / 1000, args.error_rate, args.amadeus_rate, args.main_args)
+        print_result(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
@@ -0,0 +1,133 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+import config  # loads the .env file (once per process)
+from metrics import metrics
+
+# Local SQLite file used for all cached API data
+CACHE_DB = os.getenv("CACHE_DB", "cache.sqlite")
+
+
+class CacheStore:
+    """
+    Small persistent key-value cache backed by SQLite.
+      - Values are stored as JSON, grouped by namespace (e.g. "iata", "coordinates")
+      - Every entry has its own TTL (time to live) in seconds
+      - Identical lookups running at the same time share one fetch (in-run dedup)
+    """
+
+    def __init__(self, path=CACHE_DB):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT, key TEXT, value TEXT, expires_at REAL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self.conn.commit()
+
+        # Lookups that are currently being fetched: {(namespace, key): Future}
+        self.pending = {}
+
+    def get(self, namespace, key):
+        """
+        Returns the cached value, or None if it is missing or expired.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def expires_at(self, namespace, key):
+        """
+        Returns when an entry expires (time.time() seconds), or None if there is no entry.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT expires_at FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def set(self, namespace, key, value, ttl):
+        """
+        Stores a value for `ttl` seconds.
+        """
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), time.time() + ttl)
+            )
+            self.conn.commit()
+
+    def items(self, namespace, include_expired=False):
+        """
+        Returns all entries of a namespace as a list of (key, value).
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT key, value, expires_at FROM cache WHERE namespace = ?", (namespace,)
+            ).fetchall()
+
+        now = time.time()
+        return [(key, json.loads(value)) for key, value, expires_at in rows if include_expired or expires_at >= now]
+
+    def get_or_fetch(self, namespace, key, fetch, ttl, empty_ttl=None):
+        """
+        Returns the cached value, or calls `fetch()` and caches its result.
+        If another thread is already fetching the same key, waits for its result
+        instead of sending a second request.
+        None results (errors) are not cached. Empty results ("", [], {}, e.g. "not found")
+        are cached for `empty_ttl` seconds when it is given, like other values otherwise.
+        """
+        value = self.get(namespace, key)
+        metrics.record_cache(namespace, hit=value is not None)
+        if value is not None:
+            return value
+
+        with self.lock:
+            future = self.pending.get((namespace, key))
+            owner = future is None
+            if owner:
+                future = Future()
+                self.pending[(namespace, key)] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = fetch()
+            if value is not None:
+                self.set(namespace, key, value, ttl if value or empty_ttl is None else empty_ttl)
+            future.set_result(value)
+            return value
+        except Exception as error:
+            future.set_exception(error)
+            raise
+        finally:
+            with self.lock:
+                del self.pending[(namespace, key)]
+
+
+# One shared cache per process, created on first use
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """
+    Returns the shared CacheStore.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CacheStore()
+        return _store
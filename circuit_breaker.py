@@ -0,0 +1,172 @@
+# --- Timeouts and circuit breakers for outbound calls ---
+# Every request gets a connect and a read timeout per endpoint, so one stalled socket
+# can't hang the run. Override with TIMEOUT_<ENDPOINT>=connect,read
+# (e.g. TIMEOUT_FLIGHT_OFFERS=3,20). Read timeouts never go past the run deadline.
+# Every endpoint also has a circuit breaker: after FAILURE_THRESHOLD failures in a row
+# its calls fail at once (no request is sent) for COOLDOWN seconds, then one probe
+# request is let through; if it works, the endpoint is used normally again.
+
+import os
+import time
+import threading
+import requests
+import config  # loads the .env file (once per process)
+from deadline import run_deadline, DeadlineExceeded
+from metrics import metrics
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 20)
+ENDPOINT_TIMEOUTS = {
+    "token": (3.05, 10),
+    "iata": (3.05, 10),
+    "coordinates": (3.05, 10),
+    "flight_offers": (3.05, 30),   # flight search can take a while on the Amadeus side
+    "hotel_list": (3.05, 20),
+    "hotel_offers": (3.05, 30),
+    "weather": (3.05, 20),
+    "sheety_get": (3.05, 20),
+    "sheety_put": (3.05, 20),
+}
+
+# Shortest read timeout left near the deadline (so the last requests still have a chance)
+MIN_READ_TIMEOUT = 1
+
+# Failures in a row that open a circuit, and seconds before the next probe
+FAILURE_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", 5))
+COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", 30))
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    Raised instead of sending a request while the endpoint's circuit is open.
+    """
+
+
+def timeout_for(endpoint):
+    """
+    (connect, read) timeout for an endpoint, with the read timeout cut to the time left before the deadline.
+    """
+    connect, read = ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+
+    override = os.getenv(f"TIMEOUT_{endpoint.upper()}")
+    if override:
+        connect, read = (float(value) for value in override.split(","))
+
+    remaining = run_deadline.remaining()
+    if remaining is not None:
+        read = max(min(read, remaining), MIN_READ_TIMEOUT)
+    return connect, read
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one endpoint.
+      - closed: requests are sent; FAILURE_THRESHOLD failures in a row open it
+      - open: requests fail at once with CircuitOpenError (counted as skipped)
+      - half open: after COOLDOWN one probe request is sent; success closes it, failure opens it again
+    Failures are exceptions (timeouts, connection errors) and 5xx responses.
+    """
+
+    def __init__(self, name, threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0
+        self.skipped = 0
+
+    def allow(self):
+        """
+        Returns True if a request may be sent now.
+        """
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                # Let one probe through
+                self.state = "half open"
+                return True
+            self.skipped += 1
+
+        metrics.record_skip(self.name)
+        return False
+
+    def success(self):
+        with self.lock:
+            if self.state != "closed":
+                print(f"Circuit for {self.name} closed again.")
+            self.state = "closed"
+            self.failures = 0
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == "half open" or (self.state == "closed" and self.failures >= self.threshold):
+                if self.state == "closed":
+                    print(f"Circuit for {self.name} opened after {self.failures} failures in a row.")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def call(self, send):
+        """
+        Calls `send()` (an outbound request) through the breaker.
+        Raises CircuitOpenError without calling it while the circuit is open.
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} is failing, request skipped (circuit open)")
+
+        try:
+            response = send()
+        except DeadlineExceeded:
+            # Not the endpoint's fault (the request was never sent); a skipped probe is tried again later
+            with self.lock:
+                if self.state == "half open":
+                    self.state = "open"
+            raise
+        except Exception:
+            self.failure()
+            raise
+
+        if getattr(response, "status_code", 200) >= 500:
+            self.failure()
+        else:
+            self.success()
+        return response
+
+
+# One breaker per endpoint, shared by the whole process
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint):
+    """
+    Returns the shared CircuitBreaker for an endpoint.
+    """
+    with _breakers_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker(endpoint)
+        return _breakers[endpoint]
+
+
+def guarded(endpoint, send):
+    """
+    Sends one request with its endpoint's breaker and timeout: `send(timeout)` → response.
+    """
+    return get_breaker(endpoint).call(lambda: send(timeout_for(endpoint)))
+
+
+def report():
+    """
+    Prints the endpoints whose requests were skipped by an open circuit.
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+
+    skipped = {breaker.name: breaker.skipped for breaker in breakers if breaker.skipped}
+    if skipped:
+        details = ", ".join(f"{name}: {count}" for name, count in sorted(skipped.items()))
+        print(f"Circuit breakers: requests skipped because an endpoint was failing – {details}.")
@@ -0,0 +1,350 @@
+# --- Command-line entry point ---
+# One command with subcommands, so short scheduled jobs only load what they need:
+#   python cli.py resolve            – city names → IATA codes (--write saves them to the sheet)
+#   python cli.py search             – cheapest flights for the sheet destinations
+#   python cli.py score              – weather score for every departure date
+#   python cli.py notify "text"      – send one WhatsApp message
+#   python cli.py run                – the full flow (same as python main.py)
+#   python cli.py history BEG PAR    – cheapest weeks, percentiles and trend from the price archive
+#   python cli.py thresholds         – sheet prices suggested by the archive (--write saves them)
+# Common options: --dry-run (no messages, no sheet writes), --metrics, --timing,
+#   --deadline SECONDS (stop starting new work close to the limit)
+# Heavy modules (twilio, NumPy, ...) are imported inside the subcommands that use them.
+
+import time
+
+STARTED = time.perf_counter()
+
+import os
+import sys
+import argparse
+import config  # loads the .env file (once per process)
+
+# Search settings used by every subcommand (can be changed with the options below)
+SEARCH_DAYS = 7
+# Stay lengths in nights; several lengths share the weather and hotel work (e.g. [3, 5, 7, 10])
+STAY_DAYS = [7]
+MIN_SCORE = 3.5
+
+# Score the weather for every date first and search flights only on good days
+# (default for --weather-first / --no-weather-first; off = search every date, as before)
+WEATHER_FIRST = os.getenv("WEATHER_FIRST", "0") == "1"
+
+
+def sheet_rows(cities=None):
+    """
+    Reads the sheet rows (optionally only the given cities).
+    """
+    from google_sheet_data import SheetData
+
+    rows = SheetData().get_data()["flights"]
+    if cities:
+        wanted = {city.upper() for city in cities}
+        rows = [row for row in rows if row["city"].upper() in wanted]
+    return rows
+
+
+def make_notifier(args):
+    """
+    WhatsApp notifier, or a stub that only keeps the messages in a dry run.
+    """
+    if args.dry_run:
+        from notification import StubNotifier
+        return StubNotifier()
+
+    from notification import WhatsAppNotifier
+    return WhatsAppNotifier()
+
+
+def print_dry_run_messages(notifier):
+    for text in notifier.sent:
+        print(f"\n--- Message (dry run, not sent) ---\n{text}")
+
+
+# --- Subcommands ---
+
+def resolve(args):
+    """
+    Prints the IATA code of every sheet city. With --write, saves changed codes to the sheet.
+    """
+    from google_sheet_data import SheetData
+    from amadeus_flight_data import FlightData
+
+    sheet = SheetData()
+    flight_data = FlightData()
+    rows = sheet.get_data()["flights"]
+
+    updates = []
+    for row in rows:
+        code = flight_data.get_iata_codes(row["city"].upper())
+        print(f"{row['city']}: {code or 'not found'}")
+        if code:
+            updates.append({"id": row["id"], "iataCode": code})
+
+    if args.write:
+        if args.dry_run:
+            print(f"Dry run: {len(updates)} rows not written to the sheet.")
+        else:
+            print(f"{sheet.sync_rows(updates)} rows updated in the sheet.")
+
+
+def search(args):
+    """
+    Prints the cheapest flight per day for the sheet destinations.
+    """
+    from amadeus_flight_data import FlightData, ORIGINS
+    from deadline import run_deadline
+
+    flight_data = FlightData()
+    destinations = []
+    for row in sheet_rows(args.city):
+        code = flight_data.get_iata_codes(row["city"].upper())
+        if code:
+            destinations.append((code, row["price"]))
+
+    results = flight_data.search_many(destinations, args.days, origins=ORIGINS)
+    for code, flights in results.items():
+        print(f"\n{code}: {len(flights)} flight(s)")
+        for flight in flights:
+            print(f"  {flight['origin']} → {flight['airport']}  {flight['departureDate']} "
+                  f"{flight['departureTime']}  {flight['price']} EUR")
+
+    run_deadline.report()
+
+
+def score(args):
+    """
+    Prints the weather score of a stay starting on every departure date (per stay length).
+    """
+    from amadeus_flight_data import FlightData
+    from weather_data import Weather
+    from date_planner import DatePlanner
+
+    flight_data = FlightData()
+    planner = DatePlanner(flight_data, Weather(), args.days, args.stay_days, args.min_score)
+    dates = flight_data.search_dates(args.days)
+
+    for row in sheet_rows(args.city):
+        code = flight_data.get_iata_codes(row["city"].upper())
+        location = planner.city_location(code) if code else None
+        if location is None or not dates:
+            print(f"\n{row['city']}: no location")
+            continue
+
+        print(f"\n{row['city']} ({code}):")
+        scores = planner.stay_scores(location, dates)
+        for i, date in enumerate(dates):
+            values = {nights: float(values[i]) for nights, values in scores.items() if i < len(values)}
+            if not values:
+                break
+            mark = "✓" if max(values.values()) >= args.min_score else " "
+            if len(scores) == 1:
+                text = f"{next(iter(values.values()))}"
+            else:
+                text = "  ".join(f"{nights}n: {value}" for nights, value in values.items())
+            print(f"  {mark} {date.strftime('%Y-%m-%d')}  {text}")
+
+
+def notify(args):
+    """
+    Sends one WhatsApp message.
+    """
+    notifier = make_notifier(args)
+    sent = notifier.send_message(args.message)
+    if args.dry_run:
+        print_dry_run_messages(notifier)
+    return 0 if sent else 1
+
+
+def run(args):
+    """
+    The full flow: IATA codes → flights → weather score → hotel offer → WhatsApp digest.
+    """
+    from amadeus_flight_data import FlightData, ORIGINS
+    from weather_data import Weather
+    from hotel_data import Hotel
+    from pipeline import Pipeline
+    from date_planner import DatePlanner
+    from deal_digest import DealDigest
+    from state_store import StateStore
+    from quota_planner import QuotaPlanner, BUDGETS
+    from price_archive import PriceArchive
+    from hotel_catalog import HotelCatalog
+
+    rows = sheet_rows(args.city)
+
+    flight_data = FlightData()
+    flight_data.get_access_token()  # Get Amadeus API access token
+    weather = Weather()
+    hotel = Hotel()
+    hotel.hotel_acc_token()  # Get Amadeus Hotel API access token
+    notifier = make_notifier(args)
+    digest = DealDigest(notifier, dry_run=args.dry_run)  # Collects new deals and sends them as one message
+
+    planner = None
+    if args.weather_first:
+        planner = DatePlanner(flight_data, weather, args.days, args.stay_days, args.min_score, origins=ORIGINS)
+
+    # Quota plan (AMADEUS_BUDGET / WEATHER_BUDGET set): search the most promising destinations
+    # that fit in the remaining API calls, instead of going through the sheet in order
+    plan_by_budget = any(budget is not None for budget in BUDGETS.values())
+    # Incremental mode: reuse fresh results from earlier runs and report only what changed.
+    # The quota planner also needs the state store (for its history), but a budget alone
+    # only records observations; nothing is reused without --incremental.
+    state = StateStore() if args.incremental or plan_by_budget else None
+    if plan_by_budget:
+        rows = QuotaPlanner(flight_data, state, days=args.days, origins=ORIGINS,
+                            stay_days=args.stay_days).plan(rows)
+
+    # Flights are searched from every origin in FLIGHT_ORIGINS (default: BEG)
+    pipeline = Pipeline(flight_data, weather, hotel, digest, days=args.days, stay_days=args.stay_days,
+                        min_score=args.min_score, planner=planner, state=state, origins=ORIGINS,
+                        archive=PriceArchive(), catalog=HotelCatalog(hotel), incremental=args.incremental)
+    pipeline.run(rows)
+    digest.close()  # Wait until the digest is sent
+
+    if args.dry_run:
+        print_dry_run_messages(notifier)
+
+
+def history(args):
+    """
+    Prints what the price archive knows about one route.
+    """
+    from price_archive import PriceArchive
+
+    archive = PriceArchive()
+    origin, destination = args.origin.upper(), args.destination.upper()
+
+    weeks = archive.cheapest_weeks(origin, destination, limit=args.limit)
+    if not weeks:
+        print(f"No archived flights for {origin} → {destination}")
+        return 1
+
+    print(f"Cheapest weeks {origin} → {destination}:")
+    for monday, price in weeks:
+        print(f"  week of {monday}  {price} EUR")
+
+    percentiles = ", ".join(f"p{p}: {value}" for p, value in archive.percentiles(origin, destination).items())
+    print(f"Price percentiles (EUR): {percentiles}")
+
+    trend = archive.trend(origin, destination)
+    if trend is not None:
+        print(f"Trend of the lowest daily price: {trend:+} EUR/day")
+
+
+def thresholds(args):
+    """
+    Prints the sheet price suggested by the archive for every sheet row
+    (raised where too few searches found a flight, see PriceArchive.suggest_threshold).
+    With --write, saves the changed prices to the sheet.
+    """
+    from google_sheet_data import SheetData
+    from amadeus_flight_data import FlightData
+    from price_archive import PriceArchive
+
+    sheet = SheetData()
+    flight_data = FlightData()
+    archive = PriceArchive()
+    rows = sheet.get_data()["flights"]
+
+    updates = []
+    for row in rows:
+        code = row.get("iataCode") or flight_data.get_iata_codes(row["city"].upper())
+        suggested = archive.suggest_threshold(code, float(row["price"])) if code else None
+        if suggested is None:
+            print(f"{row['city']}: {row['price']} EUR (not enough history)")
+            continue
+        print(f"{row['city']}: {row['price']} → {suggested} EUR")
+        if suggested != row["price"]:
+            updates.append({"id": row["id"], "price": suggested})
+
+    if args.write:
+        if args.dry_run:
+            print(f"Dry run: {len(updates)} rows not written to the sheet.")
+        else:
+            print(f"{sheet.sync_rows(updates)} rows updated in the sheet.")
+
+
+# --- Argument parsing ---
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--dry-run", action="store_true",
+                        help="no outbound side effects: messages are printed, the sheet is not written")
+    common.add_argument("--metrics", action="store_true", help="write metrics.json and metrics.prom")
+    common.add_argument("--timing", action="store_true", help="print startup and command time")
+    common.add_argument("--deadline", type=float, default=float(os.getenv("RUN_DEADLINE", 0)) or None,
+                        help="time limit for the run in seconds (default: RUN_DEADLINE)")
+    common.add_argument("--days", type=int, default=SEARCH_DAYS, help="days ahead to search")
+    common.add_argument("--stay-days", type=int, nargs="+", default=STAY_DAYS,
+                        help="length(s) of the stay in nights, e.g. --stay-days 3 5 7 10")
+    common.add_argument("--min-score", type=float, default=MIN_SCORE, help="lowest weather score")
+
+    parser = argparse.ArgumentParser(description="Flight deals with good weather and a hotel.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("resolve", parents=[common], help="city names → IATA codes")
+    command.add_argument("--write", action="store_true", help="save changed codes to the sheet")
+    command.set_defaults(func=resolve)
+
+    command = commands.add_parser("search", parents=[common], help="search flights")
+    command.add_argument("--city", nargs="+", help="only these sheet cities")
+    command.set_defaults(func=search)
+
+    command = commands.add_parser("score", parents=[common], help="weather score per departure date")
+    command.add_argument("--city", nargs="+", help="only these sheet cities")
+    command.set_defaults(func=score)
+
+    command = commands.add_parser("notify", parents=[common], help="send one WhatsApp message")
+    command.add_argument("message", help="message text")
+    command.set_defaults(func=notify)
+
+    command = commands.add_parser("run", parents=[common], help="the full flow")
+    command.add_argument("--city", nargs="+", help="only these sheet cities")
+    command.add_argument("--incremental", action="store_true",
+                         help="reuse fresh results from earlier runs and report only changes")
+    command.add_argument("--weather-first", dest="weather_first", action="store_true", default=WEATHER_FIRST,
+                         help="score the weather of every date first and search flights only on good days")
+    command.add_argument("--no-weather-first", dest="weather_first", action="store_false",
+                         help="search flights on every date")
+    command.set_defaults(func=run)
+
+    command = commands.add_parser("history", parents=[common], help="price history of one route")
+    command.add_argument("origin", help="origin airport, e.g. BEG")
+    command.add_argument("destination", help="destination city code, e.g. PAR")
+    command.add_argument("--limit", type=int, default=5, help="number of weeks to show")
+    command.set_defaults(func=history)
+
+    command = commands.add_parser("thresholds", parents=[common], help="sheet prices from the price history")
+    command.add_argument("--write", action="store_true", help="save changed prices to the sheet")
+    command.set_defaults(func=thresholds)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    from metrics import metrics
+    if args.metrics:
+        metrics.enabled = True
+
+    if args.deadline:
+        from deadline import run_deadline
+        run_deadline.start(args.deadline)
+
+    command_started = time.perf_counter()
+    status = args.func(args)
+
+    if metrics.enabled:
+        metrics.write()
+
+    if args.timing:
+        print(f"\nStartup: {(command_started - STARTED) * 1000:.0f} ms, "
+              f"{args.command}: {(time.perf_counter() - command_started) * 1000:.0f} ms")
+    return status or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+# --- Local climatology for dates beyond the forecast horizon ---
+# Every weather timeline the app fetches is also added to a small NumPy file:
+# per location and day of the year, how many days had each weather score.
+# Only today and the next RECORD_AHEAD_DAYS days are recorded (the reliable part of a
+# forecast); later days are recorded by later runs, once they are close.
+# For departures further out than the real forecast reaches, Weather answers
+# from these normals instead of calling the API.
+# Several processes (work_queue.py workers) can share the file: each one adds only
+# its own new days to the file as it is on disk when saving.
+# Usage: python climatology.py     (builds the file from timelines already in the cache)
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import numpy as np
+import config  # loads the .env file (once per process)
+from weather_scoring import day_score, MAX_SCORE
+
+CLIMATOLOGY_FILE = os.getenv("CLIMATOLOGY_FILE", "climatology.npz")
+
+# A day's normal uses recorded days up to this many days before and after it
+SMOOTHING_DAYS = 7
+
+# Fewer recorded days than this (in the smoothing window) → no normal for that day
+MIN_SAMPLES = 3
+
+# Recorded days must come from at least this many different years (in the smoothing window),
+# so one season's forecasts are never copied forward as "normals"
+MIN_YEARS = 2
+
+# Days after today that are recorded (further forecast days are too unreliable)
+RECORD_AHEAD_DAYS = 1
+
+# Condition text that represents each score, so normals can be scored like real forecasts
+NORMAL_CONDITIONS = {
+    0: "Thunderstorm (normal)",
+    1: "Fog (normal)",
+    2: "Rain (normal)",
+    3: "Variable (normal)",
+    4: "Partially cloudy (normal)",
+    5: "Clear (normal)",
+}
+
+DAYS_IN_YEAR = 366
+
+
+def day_of_year(date):
+    """
+    0-based day of the year for a "YYYY-MM-DD" string.
+    """
+    return datetime.strptime(date, "%Y-%m-%d").timetuple().tm_yday - 1
+
+
+class Climatology:
+    """
+    Per-location, per-day-of-year counts of daily weather scores.
+      - counts: uint16 array [location, day of year, score] (about 4 KB per location)
+      - recorded_until: last date (ordinal) recorded for each location,
+        so overlapping timelines from later runs are not counted twice
+      - years / last_year: [location, day of year] number of different years recorded
+        for that day, and the last one (to count each year once)
+    """
+
+    def __init__(self, path=CLIMATOLOGY_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.changed = False
+
+        # Days recorded by this process since the last save: [(location, date, score)]
+        self.pending = []
+
+        self._load()
+
+    def _load(self):
+        """
+        Reads the arrays from the file (or starts empty).
+        """
+        self.index = {}
+        self.counts = np.zeros((0, DAYS_IN_YEAR, MAX_SCORE + 1), dtype=np.uint16)
+        self.recorded_until = np.zeros(0, dtype=np.int32)
+        self.years = np.zeros((0, DAYS_IN_YEAR), dtype=np.uint8)
+        self.last_year = np.zeros((0, DAYS_IN_YEAR), dtype=np.uint16)
+
+        if os.path.exists(self.path):
+            with np.load(self.path) as data:
+                self.index = {str(key): row for row, key in enumerate(data["locations"])}
+                self.counts = data["counts"]
+                self.recorded_until = data["recorded_until"]
+                # Files from before years were tracked: their days count for no year yet
+                rows = len(self.counts)
+                self.years = data["years"] if "years" in data else np.zeros((rows, DAYS_IN_YEAR), dtype=np.uint8)
+                self.last_year = data["last_year"] if "last_year" in data else np.zeros((rows, DAYS_IN_YEAR), dtype=np.uint16)
+
+    def add(self, location, timeline, fetched=None):
+        """
+        Records a timeline {date: conditions} for a location, fetched at `fetched` (default: now).
+        Only dates after the last recorded one and up to RECORD_AHEAD_DAYS after the fetch are counted.
+        """
+        newest = ((fetched or datetime.now()) + timedelta(days=RECORD_AHEAD_DAYS)).toordinal()
+        days = [(date, day_score(timeline[date])) for date in sorted(timeline)]
+
+        with self.lock:
+            recorded = self._record(location, days, newest)
+            if recorded:
+                self.pending.extend((location, date, score) for date, score in recorded)
+                self.changed = True
+
+    def _record(self, location, days, newest=None):
+        """
+        Counts sorted (date, score) days of a location that come after its last recorded day
+        (and not after the `newest` ordinal). Returns the days that were counted.
+        """
+        row = self._row(location)
+        last = int(self.recorded_until[row])
+        recorded = []
+
+        for date, score in days:
+            day = datetime.strptime(date, "%Y-%m-%d")
+            ordinal = day.toordinal()
+            if ordinal <= last:
+                continue
+            if newest is not None and ordinal > newest:
+                break
+            index = day_of_year(date)
+            self.counts[row, index, score] += 1
+            if self.last_year[row, index] != day.year:
+                self.last_year[row, index] = day.year
+                self.years[row, index] += 1
+            last = ordinal
+            recorded.append((date, score))
+
+        self.recorded_until[row] = last
+        return recorded
+
+    def normals(self, location, date1, date2):
+        """
+        Returns normal conditions for every day from date1 to date2 (both included),
+        or None if the location has too few recorded days (or years) for any of them.
+        """
+        with self.lock:
+            row = self.index.get(location)
+            if row is None:
+                return None
+            counts = self.counts[row].astype(np.int64)
+            years = self.years[row]
+
+        # Counts summed over a circular ±SMOOTHING_DAYS window around every day of the year
+        window = 2 * SMOOTHING_DAYS + 1
+        padded = np.concatenate((counts[-SMOOTHING_DAYS:], counts, counts[:SMOOTHING_DAYS]))
+        sums = np.concatenate((np.zeros((1, counts.shape[1]), dtype=np.int64), np.cumsum(padded, axis=0)))
+        smoothed = sums[window:] - sums[:-window]
+
+        samples = smoothed.sum(axis=1)
+
+        # Most different years recorded for any day in the window around every day
+        padded_years = np.concatenate((years[-SMOOTHING_DAYS:], years, years[:SMOOTHING_DAYS]))
+        window_years = np.lib.stride_tricks.sliding_window_view(padded_years, window).max(axis=1)
+        mean_scores = (smoothed * np.arange(counts.shape[1])).sum(axis=1) / np.maximum(samples, 1)
+
+        conditions = []
+        day = datetime.strptime(date1, "%Y-%m-%d")
+        last = datetime.strptime(date2, "%Y-%m-%d")
+        while day <= last:
+            index = day.timetuple().tm_yday - 1
+            if samples[index] < MIN_SAMPLES or window_years[index] < MIN_YEARS:
+                return None
+            conditions.append(NORMAL_CONDITIONS[int(round(mean_scores[index]))])
+            day += timedelta(days=1)
+
+        return conditions
+
+    def save(self):
+        """
+        Adds the days recorded since the last save to the file (to a temp file first,
+        so a crash never leaves half a file). The file is read again under a lock first,
+        so days saved meanwhile by other processes are kept, and days they already
+        recorded for a location are not counted twice.
+        """
+        with self.lock:
+            if not self.changed:
+                return
+
+            with self._file_lock():
+                self._load()
+                by_location = {}
+                for location, date, score in self.pending:
+                    by_location.setdefault(location, []).append((date, score))
+                for location, days in by_location.items():
+                    self._record(location, days)
+
+                locations = np.array(sorted(self.index, key=self.index.get), dtype=str)
+                rows = len(locations)
+                temp_path = f"{self.path}.tmp.npz"
+                np.savez_compressed(temp_path, locations=locations,
+                                    counts=self.counts[:rows], recorded_until=self.recorded_until[:rows],
+                                    years=self.years[:rows], last_year=self.last_year[:rows])
+                os.replace(temp_path, self.path)
+
+            self.pending = []
+            self.changed = False
+
+    @contextmanager
+    def _file_lock(self):
+        """
+        Holds an exclusive lock shared by all processes using the file (a SQLite lock file,
+        like the shared rate limiter uses).
+        """
+        conn = sqlite3.connect(f"{self.path}.lock", timeout=60, isolation_level=None)
+        try:
+            conn.execute("BEGIN EXCLUSIVE")
+            yield
+        finally:
+            conn.close()
+
+    def _row(self, location):
+        """
+        Returns the array row of a location, adding one (with room to grow) if needed.
+        """
+        row = self.index.get(location)
+        if row is not None:
+            return row
+
+        row = len(self.index)
+        if row >= len(self.counts):
+            size = max(2 * len(self.counts), 16)
+            counts = np.zeros((size, DAYS_IN_YEAR, MAX_SCORE + 1), dtype=np.uint16)
+            counts[:len(self.counts)] = self.counts
+            recorded_until = np.zeros(size, dtype=np.int32)
+            recorded_until[:len(self.recorded_until)] = self.recorded_until
+            years = np.zeros((size, DAYS_IN_YEAR), dtype=np.uint8)
+            years[:len(self.years)] = self.years
+            last_year = np.zeros((size, DAYS_IN_YEAR), dtype=np.uint16)
+            last_year[:len(self.last_year)] = self.last_year
+            self.counts, self.recorded_until = counts, recorded_until
+            self.years, self.last_year = years, last_year
+
+        self.index[location] = row
+        return row
+
+
+# One store per process, shared by all Weather objects
+_climatology = None
+_climatology_lock = threading.Lock()
+
+
+def get_climatology():
+    global _climatology
+    with _climatology_lock:
+        if _climatology is None:
+            _climatology = Climatology()
+        return _climatology
+
+
+if __name__ == "__main__":
+    from cache_store import get_store
+    from weather_data import FORECAST_TTL
+
+    climatology = get_climatology()
+    store = get_store()
+    timelines = store.items("weather", include_expired=True)
+    for location, timeline in timelines:
+        # When the timeline was fetched decides which of its days were near-term
+        fetched = datetime.fromtimestamp(store.expires_at("weather", location) - FORECAST_TTL)
+        climatology.add(location, timeline, fetched)
+    climatology.save()
+    print(f"Climatology: {len(climatology.index)} locations in {climatology.path} "
+          f"({len(timelines)} cached timelines read).")
@@ -0,0 +1,8 @@
+# --- Configuration ---
+# Loads the .env file once per process. Every module that reads settings with
+# os.getenv imports this module first, so the .env values are always in place
+# (and the file is read only once, no matter how many modules use it).
+
+from dotenv import load_dotenv
+
+load_dotenv()
@@ -0,0 +1,256 @@
+# --- Long-running scheduler ---
+# Stays resident instead of starting from zero on every cron run: API tokens,
+# the Twilio client and all caches stay warm. Every (origin, destination, date)
+# route is checked on its own timer; routes whose price moves a lot are checked
+# more often, stable routes less often.
+# Usage: python daemon.py     (stop with Ctrl+C or SIGTERM; status in daemon_status.json)
+
+import json
+import heapq
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from google_sheet_data import SheetData
+from amadeus_flight_data import FlightData, ORIGINS
+from weather_data import Weather
+from hotel_data import Hotel
+from notification import WhatsAppNotifier
+from pipeline import Pipeline
+from deal_digest import DealDigest
+from state_store import StateStore
+from price_archive import PriceArchive
+from hotel_catalog import HotelCatalog
+
+# Scheduling (seconds)
+BASE_INTERVAL = 3600          # interval for a route with "normal" price movement
+MIN_INTERVAL = 15 * 60        # most volatile routes
+MAX_INTERVAL = 12 * 3600      # most stable routes
+TARGET_VOLATILITY = 0.05      # average relative price change that gives BASE_INTERVAL
+SHEET_REFRESH = 30 * 60       # re-read the sheet (cheap when unchanged, see SheetData)
+FLUSH_INTERVAL = 5 * 60       # send collected deals at most this often
+
+SEARCH_DAYS = 7
+STAY_DAYS = 7
+MIN_SCORE = 3.5
+WORKERS = 4
+
+STATUS_FILE = "daemon_status.json"
+
+
+class Scheduler:
+    """
+    Keeps a timer per route (origin, destination, departure date) in a heap
+    and runs every check when its time comes.
+    """
+
+    def __init__(self, workers=WORKERS, status_file=STATUS_FILE):
+        # Everything is created once and reused for the whole life of the daemon
+        self.sheet = SheetData()
+        self.flight_data = FlightData()
+        self.weather = Weather()
+        self.hotel = Hotel()
+        self.digest = DealDigest(WhatsAppNotifier())
+        # Flight prices must be fresh on every check, other sources keep their TTLs
+        self.state = StateStore(ttls={"flight": 0})
+        self.archive = PriceArchive()
+        self.pipeline = Pipeline(self.flight_data, self.weather, self.hotel, self.digest,
+                                 days=SEARCH_DAYS, stay_days=STAY_DAYS, min_score=MIN_SCORE,
+                                 state=self.state, origins=ORIGINS, archive=self.archive,
+                                 catalog=HotelCatalog(self.hotel))
+
+        self.workers = workers
+        self.status_file = status_file
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+
+        # Heap of (due time, route); route = (origin, code, price, date string)
+        self.queue = []
+        self.routes = set()
+        self.running = set()
+
+        # Status
+        self.started = time.time()
+        self.checks = 0
+        self.deals = 0
+        self.errors = 0
+        self.last_error = None
+
+    # --- Schedule ---
+
+    def refresh_routes(self):
+        """
+        Reads the sheet and adds a timer for every new route.
+        Routes for past dates (or removed destinations) are dropped.
+        The departure dates are computed again on every refresh, so after midnight
+        the new last day is added and today's date is dropped.
+        """
+        sheet_data = self.sheet.get_data()
+        dates = [date.strftime("%Y-%m-%d") for date in self.flight_data.search_dates(SEARCH_DAYS)]
+
+        routes = set()
+        for row in sheet_data["flights"]:
+            code = self.flight_data.get_iata_codes(row["city"].upper())
+            if code is None:
+                continue
+            for origin in ORIGINS:
+                for date in dates:
+                    routes.add((origin, code, row["price"], date))
+
+        now = time.time()
+        with self.lock:
+            for route in routes - self.routes:
+                heapq.heappush(self.queue, (now, route))
+            self.routes = routes
+            self.queue = [(due, route) for due, route in self.queue if route in routes]
+            heapq.heapify(self.queue)
+
+    def next_interval(self, route):
+        """
+        Time until the next check of a route, based on its recent price history.
+        Large price changes → shorter interval, no changes → longer interval.
+        """
+        origin, code, price, date = route
+        key = self.pipeline.flight_key(origin, code, price, datetime.strptime(date, "%Y-%m-%d"))
+        prices = [float(value["price"]) for value, observed_at in self.state.history("flight", key, limit=10) if value]
+
+        if len(prices) < 2:
+            return BASE_INTERVAL
+
+        changes = [abs(new - old) / old for new, old in zip(prices, prices[1:]) if old]
+        volatility = sum(changes) / len(changes) if changes else 0
+        if volatility == 0:
+            return MAX_INTERVAL
+
+        interval = BASE_INTERVAL * TARGET_VOLATILITY / volatility
+        return min(max(interval, MIN_INTERVAL), MAX_INTERVAL)
+
+    # --- Checks ---
+
+    def check(self, route):
+        """
+        Checks one route (flight → weather → hotel → digest) and schedules the next check.
+        """
+        origin, code, price, date = route
+
+        # The departure day has come (or passed) since the last sheet refresh – drop the route
+        if date <= datetime.now().strftime("%Y-%m-%d"):
+            with self.lock:
+                self.running.discard(route)
+                self.routes.discard(route)
+            return
+
+        try:
+            deals = self.pipeline.check((origin, code, price, datetime.strptime(date, "%Y-%m-%d")))
+            with self.lock:
+                self.checks += 1
+                self.deals += len(deals)
+        except Exception as e:
+            print(f"Error checking {origin}→{code} on {date}: {e}")
+            with self.lock:
+                self.errors += 1
+                self.last_error = f"{origin}→{code} {date}: {e}"
+
+        interval = self.next_interval(route)
+        with self.lock:
+            self.running.discard(route)
+            if route in self.routes:
+                heapq.heappush(self.queue, (time.time() + interval, route))
+
+    def due_routes(self):
+        """
+        Takes all routes whose time has come from the heap.
+        """
+        now = time.time()
+        due = []
+        with self.lock:
+            while self.queue and self.queue[0][0] <= now:
+                route = heapq.heappop(self.queue)[1]
+                if route not in self.running:
+                    self.running.add(route)
+                    due.append(route)
+        return due
+
+    # --- Main loop ---
+
+    def run(self):
+        """
+        Runs until stop() is called (Ctrl+C / SIGTERM).
+        """
+        next_refresh = 0
+        next_flush = time.time() + FLUSH_INTERVAL
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while not self.stop_event.is_set():
+                now = time.time()
+
+                if now >= next_refresh:
+                    try:
+                        self.refresh_routes()
+                    except Exception as e:
+                        print(f"Error reading the sheet: {e}")
+                    next_refresh = now + SHEET_REFRESH
+
+                for route in self.due_routes():
+                    executor.submit(self.check, route)
+
+                if now >= next_flush:
+                    self.digest.flush()
+                    self.archive.flush()
+                    next_flush = now + FLUSH_INTERVAL
+
+                self.write_status()
+
+                # Sleep until the next check is due (wake up at once on stop)
+                with self.lock:
+                    wait = self.queue[0][0] - time.time() if self.queue else 5
+                self.stop_event.wait(min(max(wait, 0.5), 5))
+
+            print("Stopping: waiting for running checks...")
+
+        # Send what was found before stopping
+        self.digest.flush()
+        self.digest.close()
+        self.archive.flush()
+        self.write_status(stopped=True)
+        print("Daemon stopped.")
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def write_status(self, stopped=False):
+        """
+        Writes the current state of the daemon to the status file.
+        """
+        with self.lock:
+            upcoming = sorted(self.queue)[:10]
+            status = {
+                "running": not stopped,
+                "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+                "updated": datetime.now().isoformat(timespec="seconds"),
+                "routes": len(self.routes),
+                "checks": self.checks,
+                "deals": self.deals,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "checks_running": len(self.running),
+                "next_checks": [
+                    {"route": f"{origin}→{code} {date}",
+                     "at": datetime.fromtimestamp(due).isoformat(timespec="seconds")}
+                    for due, (origin, code, price, date) in upcoming
+                ],
+            }
+
+        with open(self.status_file, "w", encoding="utf-8") as file:
+            json.dump(status, file, indent=2)
+
+
+if __name__ == "__main__":
+    scheduler = Scheduler()
+
+    # Graceful shutdown on Ctrl+C and SIGTERM
+    signal.signal(signal.SIGINT, scheduler.stop)
+    signal.signal(signal.SIGTERM, scheduler.stop)
+
+    scheduler.run()
@@ -0,0 +1,106 @@
+import threading
+from datetime import timedelta
+import numpy as np
+from weather_scoring import BatchScorer
+
+
+def stay_lengths(stay_days):
+    """
+    Stay length(s) in nights → sorted list without duplicates (7 → [7], [10, 3, 7] → [3, 7, 10]).
+    """
+    if isinstance(stay_days, int):
+        return [stay_days]
+    return sorted(set(stay_days))
+
+
+class DatePlanner:
+    """
+    Decides which departure dates are worth a flight search.
+    Weather for a destination is cheap (one cached timeline per location),
+    while flight-offer requests are slow and strictly rate limited.
+    So every candidate date is scored first, and only dates with good weather
+    over the whole stay are searched for flights.
+    With several stay lengths, a date is searched if any of its stays has good weather.
+    """
+
+    def __init__(self, flight_data, weather, days=7, stay_days=7, min_score=3.5, origins=None):
+        self.flight_data = flight_data
+        self.weather = weather
+        self.days = days
+        self.stay_days = stay_lengths(stay_days)
+        self.min_score = min_score
+        self.scorer = BatchScorer()
+
+        # Every planned date is searched from each origin
+        self.searches_per_date = len(origins or [None])
+
+        # Statistics for the report at the end of the run
+        self.planned = 0
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    def plan(self, des_code):
+        """
+        Returns the departure dates (datetime) for a destination that pass the weather threshold.
+        If the destination coordinates are unknown, all dates are returned.
+        """
+        dates = self.flight_data.search_dates(self.days)
+        location = self.city_location(des_code)
+
+        if location is None or not dates:
+            good_dates = dates
+        else:
+            scores = self.date_scores(location, dates)
+            good_dates = [date for date, score in zip(dates, scores) if score >= self.min_score]
+
+        with self.lock:
+            self.planned += len(good_dates) * self.searches_per_date
+            self.skipped += (len(dates) - len(good_dates)) * self.searches_per_date
+
+        return good_dates
+
+    def city_location(self, des_code):
+        """
+        Returns "lat,lon" for a city code, or None if it can't be found.
+        """
+        location_data = self.flight_data.get_coordinate(airport=des_code)
+        if not location_data or not location_data.get("data"):
+            return None
+
+        geo_code = location_data["data"][0]["geoCode"]
+        return f'{geo_code["latitude"]},{geo_code["longitude"]}'
+
+    def date_scores(self, location, dates):
+        """
+        Weather scores for stays starting on each of the (consecutive) `dates`:
+        the best score over all stay lengths.
+        """
+        scores = self.stay_scores(location, dates).values()
+
+        # Near the end of a short timeline only the shorter stays have a score
+        best = np.full(max(len(values) for values in scores), -np.inf)
+        for values in scores:
+            best[:len(values)] = np.maximum(best[:len(values)], values)
+        return best
+
+    def stay_scores(self, location, dates):
+        """
+        Weather scores per stay length for stays starting on each of the (consecutive) `dates`:
+        {nights: NumPy array, one score per date}.
+        Every stay covers departure day .. departure + nights (same window as the pipeline uses),
+        and all lengths are scored from one timeline in a single call.
+        """
+        longest = self.stay_days[-1]
+        start_date = dates[0].strftime("%Y-%m-%d")
+        end_date = (dates[-1] + timedelta(days=longest)).strftime("%Y-%m-%d")
+        conditions = self.weather.get_conditions(location=location, date1=start_date, date2=end_date)
+
+        windows = self.scorer.multi_window_scores(conditions, [nights + 1 for nights in self.stay_days])
+        return {nights: windows[nights + 1][:len(dates)] for nights in self.stay_days}
+
+    def report(self):
+        """
+        Prints how many flight searches were skipped because of bad weather.
+        """
+        total = self.planned + self.skipped
+        print(f"Weather planner: {self.skipped} of {total} flight searches skipped (bad weather).")
@@ -0,0 +1,93 @@
+# --- Overall run deadline ---
+# A cli.py run can be given a time limit (--deadline seconds, default RUN_DEADLINE).
+# Close to the limit, low-priority work (new destinations and flight searches) is
+# no longer started; work already in progress (weather, hotels) runs until the limit;
+# found deals are always sent. Skipped work is counted and reported at the end.
+
+import os
+import time
+import threading
+from collections import defaultdict
+import config  # loads the .env file (once per process)
+
+# Low-priority work stops this many seconds before the limit (at most a quarter of the run time)
+DEADLINE_MARGIN = float(os.getenv("DEADLINE_MARGIN", 30))
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised instead of waiting (rate limit, retry backoff) past the run deadline.
+    """
+
+
+class RunDeadline:
+    """
+    Time limit of one run. Without start() there is no limit and every check passes.
+    """
+
+    def __init__(self):
+        self.ends_at = None
+        self.margin = 0
+        self.skipped = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def start(self, seconds, margin=DEADLINE_MARGIN):
+        """
+        Starts the clock: the run should be done `seconds` from now.
+        """
+        self.ends_at = time.monotonic() + seconds
+        self.margin = min(margin, seconds / 4)
+
+    def remaining(self):
+        """
+        Seconds left until the limit (None = no limit).
+        """
+        if self.ends_at is None:
+            return None
+        return self.ends_at - time.monotonic()
+
+    def near(self):
+        """
+        True when low-priority work should not be started anymore.
+        """
+        remaining = self.remaining()
+        return remaining is not None and remaining <= self.margin
+
+    def passed(self):
+        """
+        True when the limit is reached (only sending found deals is still allowed).
+        """
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def sleep(self, seconds):
+        """
+        Sleeps for `seconds`, unless that would go past the limit.
+        Returns False (without sleeping) if the wait would cross the deadline.
+        """
+        remaining = self.remaining()
+        if remaining is not None and seconds >= remaining:
+            return False
+        time.sleep(seconds)
+        return True
+
+    def skip(self, work):
+        """
+        Counts one piece of work (e.g. "flights") that was not done because of the deadline.
+        """
+        with self.lock:
+            self.skipped[work] += 1
+
+    def report(self):
+        """
+        Prints what was skipped because of the deadline.
+        """
+        with self.lock:
+            skipped = dict(self.skipped)
+        if skipped:
+            details = ", ".join(f"{count} {work}" for work, count in sorted(skipped.items()))
+            print(f"Run deadline: skipped {details}.")
+
+
+# One deadline per process, started by cli.py (the daemon runs without one)
+run_deadline = RunDeadline()
@@ -0,0 +1,126 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from cache_store import get_store
+
+# Twilio allows at most 1600 characters in one WhatsApp message
+MAX_MESSAGE_LENGTH = 1600
+
+# Deals whose flight price differs by less than this (EUR) count as the same deal
+PRICE_BAND = 10
+
+# How long a sent deal is remembered, so it is not sent again in later runs
+SENT_TTL = 30 * 24 * 3600
+
+# Retry settings for sending a digest
+SEND_RETRIES = 3
+RETRY_DELAY = 2  # seconds, doubled on every retry
+
+SEPARATOR = "\n-----\n"
+
+
+class DealDigest:
+    """
+    Collects deals found during a run and sends them as one WhatsApp digest
+    (or a few, if the text is longer than one message allows).
+      - Deals already sent in earlier runs are skipped (persistent key:
+        destination, dates and price band)
+      - Sending happens in a background thread with retries,
+        so a slow Twilio call never stops the search
+    """
+
+    def __init__(self, notifier, dry_run=False):
+        # Anything with send_message(text) -> bool (WhatsAppNotifier, StubNotifier)
+        self.notifier = notifier
+        self.cache = get_store()
+        # Dry run: deals are not marked as sent, so a later real run still sends them
+        self.dry_run = dry_run
+
+        self.deals = []
+        self.keys = set()
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    @staticmethod
+    def deal_key(deal):
+        """
+        Key that identifies a deal between runs: origin, city, airport, dates and flight price band.
+        """
+        flight, offer = deal["flight"], deal["offer"]
+        price_band = int(float(flight["price"]) // PRICE_BAND)
+        return (f'{flight.get("origin", "")}|{flight["cityCode"]}|{flight["airport"]}|'
+                f'{offer["checkInDate"]}|{offer["checkOutDate"]}|{price_band}')
+
+    def add(self, deal):
+        """
+        Adds a deal to the digest. Returns False if it was already sent (or added) before.
+        - deal: dict with "flight", "offer", "hotelName", "score" and "message"
+        """
+        key = self.deal_key(deal)
+
+        with self.lock:
+            if key in self.keys or self.cache.get("sent_deals", key) is not None:
+                return False
+            self.keys.add(key)
+            self.deals.append(deal)
+        return True
+
+    def flush(self):
+        """
+        Sends all collected deals in the background and starts a new digest.
+        Returns a Future with the number of sent messages.
+        """
+        with self.lock:
+            deals, self.deals = self.deals, []
+            self.keys = set()
+
+        return self.executor.submit(self._send, deals)
+
+    def close(self):
+        """
+        Waits until all digests are sent.
+        """
+        self.executor.shutdown(wait=True)
+
+    def _send(self, deals):
+        """
+        Sends the digest messages, retrying failed ones.
+        Deals are marked as sent only after their message went out.
+        """
+        sent = 0
+
+        for text, part in self.build_messages(deals):
+            for attempt in range(SEND_RETRIES):
+                if self.notifier.send_message(text):
+                    if not self.dry_run:
+                        for deal in part:
+                            self.cache.set("sent_deals", self.deal_key(deal), True, ttl=SENT_TTL)
+                    sent += 1
+                    break
+                if attempt < SEND_RETRIES - 1:
+                    time.sleep(RETRY_DELAY * 2 ** attempt)
+            else:
+                print(f"Digest with {len(part)} deal(s) could not be sent.")
+
+        return sent
+
+    @staticmethod
+    def build_messages(deals):
+        """
+        Splits deals into as few messages as possible under MAX_MESSAGE_LENGTH.
+        Returns a list of (text, deals in that text).
+        """
+        messages = []
+        text, part = "", []
+
+        for deal in deals:
+            candidate = deal["message"] if not part else text + SEPARATOR + deal["message"]
+            if part and len(candidate) > MAX_MESSAGE_LENGTH:
+                messages.append((text, part))
+                text, part = deal["message"], [deal]
+            else:
+                text, part = candidate, part + [deal]
+
+        if part:
+            messages.append((text, part))
+        return messages
@@ -0,0 +1,321 @@
+# --- Local stand-in for every API the project uses ---
+# Replays the recorded responses from benchmark_fixtures/ for Amadeus (token, cities,
+# flight offers, locations, hotels by city, hotel offers), Visual Crossing (timeline),
+# Sheety (via fake_sheety.py) and Twilio (messages). Responses are adjusted to the
+# request (codes, dates, prices), so the whole main.py flow works against it.
+# Latency and 429 responses can be injected to see how the project behaves under load.
+# Usage: python fake_api_server.py [destinations] [port]
+
+import os
+import sys
+import copy
+import json
+import time
+import random
+import zlib
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from fake_sheety import FakeSheety, SHEET_PATH
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_fixtures")
+
+# Endpoints the server knows: name → (method, path prefix)
+ENDPOINTS = {
+    "token": ("POST", "/v1/security/oauth2/token"),
+    "iata": ("GET", "/v1/reference-data/locations/cities"),
+    "hotel_list": ("GET", "/v1/reference-data/locations/hotels/by-city"),
+    "coordinates": ("GET", "/v1/reference-data/locations"),
+    "flight_offers": ("GET", "/v2/shopping/flight-offers"),
+    "hotel_offers": ("GET", "/v3/shopping/hotel-offers"),
+    "weather": ("GET", "/VisualCrossingWebServices/rest/services/timeline/"),
+    "sheety_get": ("GET", SHEET_PATH),
+    "sheety_put": ("PUT", SHEET_PATH + "/"),
+    "twilio": ("POST", "/2010-04-01/Accounts/"),
+}
+
+# Only Amadeus endpoints get 429 responses by default (the client retries them)
+AMADEUS_ENDPOINTS = {"iata", "hotel_list", "coordinates", "flight_offers", "hotel_offers"}
+
+# Weather conditions used for generated timelines (mostly good weather)
+CONDITIONS = ["Clear", "Partially cloudy", "Clear", "Overcast", "Rain, Partially cloudy", "Clear", "Snow", "Fog"]
+
+HOTELS_PER_CITY = 10
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json"), encoding="utf-8") as file:
+        return json.load(file)
+
+
+def city_code(index):
+    """
+    Three-letter code for destination number `index` (0 → AAA, 1 → AAB, ...).
+    """
+    letters = ""
+    for _ in range(3):
+        letters = chr(ord("A") + index % 26) + letters
+        index //= 26
+    return letters
+
+
+def city_name(index):
+    return f"CITY{index:04d}"
+
+
+def sheet_rows(destinations):
+    """
+    Sheet rows for `destinations` generated cities (same shape as the real Sheety sheet).
+    """
+    return [
+        {"city": city_name(i), "iataCode": "", "price": 150, "id": i + 2}
+        for i in range(destinations)
+    ]
+
+
+def stable_hash(*parts):
+    """
+    Hash that is the same in every run (unlike hash()).
+    """
+    return zlib.crc32("|".join(str(part) for part in parts).encode())
+
+
+class FakeApi:
+    """
+    Generates responses from the recorded fixtures and counts requests per endpoint.
+    """
+
+    def __init__(self, destinations, latency=0.0, error_rate=0.0, error_endpoints=AMADEUS_ENDPOINTS, seed=1):
+        self.latency = latency          # seconds added to every response
+        self.error_rate = error_rate    # share of requests answered with 429
+        self.error_endpoints = set(error_endpoints)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+        self.counts = Counter()
+        self.errors = Counter()
+
+        self.sheet = FakeSheety(sheet_rows(destinations))
+        self.fixtures = {name: load_fixture(name) for name in (
+            "token", "cities", "flight_offers", "locations", "hotels_by_city",
+            "hotel_offers", "weather_timeline", "twilio_message"
+        )}
+
+    def endpoint(self, method, path):
+        """
+        Returns the endpoint name for a request (the longest matching path prefix wins).
+        """
+        matches = [
+            (len(prefix), name) for name, (endpoint_method, prefix) in ENDPOINTS.items()
+            if method == endpoint_method and path.startswith(prefix)
+        ]
+        return max(matches)[1] if matches else None
+
+    def handle(self, method, path, query, headers, body):
+        """
+        Answers one request. Returns (status, headers, body bytes).
+        """
+        name = self.endpoint(method, path)
+        if name is None:
+            return 404, {}, b""
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self.lock:
+            self.counts[name] += 1
+            throttle = name in self.error_endpoints and self.random.random() < self.error_rate
+            if throttle:
+                self.errors[name] += 1
+
+        if throttle:
+            return 429, {"Retry-After": "0.05"}, b'{"errors": [{"status": 429, "title": "Too many requests"}]}'
+
+        if name == "sheety_get":
+            return self.sheet.handle_get(headers.get("If-None-Match"))
+        if name == "sheety_put":
+            return self.sheet.handle_put(int(path.rsplit("/", 1)[1]), json.loads(body))
+
+        data = getattr(self, name)(path, query, body)
+        status = 201 if name == "twilio" else 200
+        return status, {}, json.dumps(data).encode()
+
+    # --- Responses per endpoint ---
+
+    def token(self, path, query, body):
+        return self.fixtures["token"]
+
+    def iata(self, path, query, body):
+        data = copy.deepcopy(self.fixtures["cities"])
+        keyword = query.get("keyword", [""])[0]
+        if not keyword.startswith("CITY"):
+            data["data"] = []
+            return data
+        item = data["data"][0]
+        item["name"] = keyword
+        item["iataCode"] = city_code(int(keyword[4:]))
+        return data
+
+    def coordinates(self, path, query, body):
+        data = copy.deepcopy(self.fixtures["locations"])
+        keyword = query.get("keyword", [""])[0]
+        item = data["data"][0]
+        item["iataCode"] = keyword
+        item["geoCode"] = {
+            "latitude": round(-60 + stable_hash(keyword, "lat") % 12000 / 100, 5),
+            "longitude": round(-180 + stable_hash(keyword, "lon") % 36000 / 100, 5),
+        }
+        return data
+
+    def flight_offers(self, path, query, body):
+        data = copy.deepcopy(self.fixtures["flight_offers"])
+        destination = query["destinationLocationCode"][0]
+        date = query["departureDate"][0]
+        max_price = float(query.get("maxPrice", ["1000"])[0])
+
+        # About two out of three days have a flight under the price limit
+        if stable_hash(destination, date) % 3 == 0:
+            data["data"] = []
+            return data
+
+        price = f"{max_price * (0.5 + stable_hash(destination, date, 'price') % 50 / 100):.2f}"
+        offer = data["data"][0]
+        segment = offer["itineraries"][0]["segments"][-1]
+        offer["itineraries"][0]["segments"][0]["departure"]["at"] = f"{date}T06:15:00"
+        segment["arrival"]["iataCode"] = destination[::-1]
+        segment["arrival"]["at"] = f"{date}T08:45:00"
+        offer["price"]["total"] = price
+        offer["price"]["grandTotal"] = price
+        return data
+
+    def hotel_list(self, path, query, body):
+        data = copy.deepcopy(self.fixtures["hotels_by_city"])
+        code = query["cityCode"][0]
+        template = data["data"][0]
+        data["data"] = []
+        for i in range(HOTELS_PER_CITY):
+            hotel = dict(template, iataCode=code, hotelId=f"{code}{i:05d}", name=f"HOTEL {i} {code}")
+            data["data"].append(hotel)
+        return data
+
+    def hotel_offers(self, path, query, body):
+        data = copy.deepcopy(self.fixtures["hotel_offers"])
+        template = data["data"][0]
+        check_in = query["checkInDate"][0]
+        check_out = query["checkOutDate"][0]
+        hotel_ids = ",".join(query["hotelIds"]).split(",")
+
+        data["data"] = []
+        for hotel_id in hotel_ids:
+            # About one hotel out of four has free rooms
+            if stable_hash(hotel_id, check_in) % 4 != 0:
+                continue
+            item = copy.deepcopy(template)
+            item["hotel"]["hotelId"] = hotel_id
+            offer = item["offers"][0]
+            offer["checkInDate"] = check_in
+            offer["checkOutDate"] = check_out
+            offer["price"]["total"] = f"{300 + stable_hash(hotel_id, check_in, 'price') % 1500}.00"
+            data["data"].append(item)
+        return data
+
+    def weather(self, path, query, body):
+        data = copy.deepcopy(self.fixtures["weather_timeline"])
+        location, date1, date2 = path.rsplit("/", 3)[1:]
+        day = datetime.strptime(date1, "%Y-%m-%d")
+        last = datetime.strptime(date2, "%Y-%m-%d")
+
+        data["address"] = data["resolvedAddress"] = location
+        data["days"] = []
+        while day <= last:
+            date = day.strftime("%Y-%m-%d")
+            condition = CONDITIONS[stable_hash(location, date) % len(CONDITIONS)]
+            data["days"].append({"datetime": date, "conditions": condition})
+            day += timedelta(days=1)
+        return data
+
+    def twilio(self, path, query, body):
+        data = dict(self.fixtures["twilio_message"])
+        form = parse_qs(body.decode())
+        data["body"] = form.get("Body", [""])[0]
+        data["to"] = form.get("To", [""])[0]
+        return data
+
+    def handler(self):
+        """
+        Returns a request handler class bound to this fake API.
+        """
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self.answer("GET")
+
+            def do_POST(self):
+                self.answer("POST")
+
+            def do_PUT(self):
+                self.answer("PUT")
+
+            def answer(self, method):
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+
+                status, headers, payload = api.handle(method, url.path, parse_qs(url.query), self.headers, body)
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+
+def start(destinations, latency=0.0, error_rate=0.0, port=0):
+    """
+    Starts the fake API in a background thread. Returns (server, api).
+    """
+    api = FakeApi(destinations, latency=latency, error_rate=error_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", port), api.handler())
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, api
+
+
+def environment(server):
+    """
+    Environment variables that point every module of the project to the fake server.
+    """
+    url = f"http://127.0.0.1:{server.server_port}"
+    return {
+        "AMADEUS_URL": url,
+        "WEATHER_URL": url,
+        "SHEETY_URL": f"{url}{SHEET_PATH}",
+        "TWILIO_URL": url,
+        "FLIGHT_DATA_KEY": "fake", "FLIGHT_DATA_SECRET": "fake",
+        "HOTEL_KEY": "fake", "HOTEL_SECRET": "fake",
+        "WEATHER_API": "fake", "SHEETY_AUTH_TOKEN": "fake",
+        "TWILIO_SID": "ACFAKE00000000000000000000000000", "TWILIO_AUTH": "fake",
+        "PHONE": "+381600000000",
+    }
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8000
+    server, api = start(count, port=port)
+    print(f"Fake APIs for {count} destinations running on port {server.server_port}. Environment:")
+    for name, value in environment(server).items():
+        print(f"{name}={value}")
+    threading.Event().wait()
@@ -0,0 +1,116 @@
+# --- Local fake Sheety server ---
+# Serves a "flights" sheet from memory, with ETag support (304 when unchanged)
+# and PUT updates, so SheetData can be tried without the real Sheety API.
+# Usage: python fake_sheety.py [port]
+#        then set SHEETY_URL=http://127.0.0.1:<port>/flights/flights
+
+import sys
+import json
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SHEET_PATH = "/flights/flights"
+
+
+class FakeSheety:
+    """
+    In-memory sheet with request counters.
+    """
+
+    def __init__(self, rows):
+        self.rows = {row["id"]: dict(row) for row in rows}
+        self.lock = threading.Lock()
+        self.gets = 0
+        self.not_modified = 0
+        self.puts = 0
+
+    def etag(self):
+        body = json.dumps(self.body(), sort_keys=True).encode()
+        return '"' + hashlib.md5(body).hexdigest() + '"'
+
+    def body(self):
+        return {"flights": [self.rows[row_id] for row_id in sorted(self.rows)]}
+
+    def handle_get(self, if_none_match=None):
+        """
+        Answers GET on the sheet. Returns (status, headers, body bytes).
+        """
+        with self.lock:
+            self.gets += 1
+            etag = self.etag()
+            if if_none_match == etag:
+                self.not_modified += 1
+                return 304, {"ETag": etag}, b""
+            return 200, {"ETag": etag}, json.dumps(self.body()).encode()
+
+    def handle_put(self, row_id, payload):
+        """
+        Answers PUT on one row. Returns (status, headers, body bytes).
+        """
+        with self.lock:
+            if row_id not in self.rows:
+                return 404, {}, b""
+            self.puts += 1
+            self.rows[row_id].update(payload["flight"])
+            return 200, {}, json.dumps({"flight": self.rows[row_id]}).encode()
+
+    def handler(self):
+        """
+        Returns a request handler class bound to this sheet.
+        """
+        sheet = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != SHEET_PATH:
+                    self.send_error(404)
+                    return
+                self.reply(*sheet.handle_get(self.headers.get("If-None-Match")))
+
+            def do_PUT(self):
+                prefix = SHEET_PATH + "/"
+                if not self.path.startswith(prefix):
+                    self.send_error(404)
+                    return
+
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length))
+                self.reply(*sheet.handle_put(int(self.path[len(prefix):]), payload))
+
+            def reply(self, status, headers, body):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def start(rows, port=0):
+    """
+    Starts the fake server in a background thread.
+    Returns (server, sheet); the URL is http://127.0.0.1:<server.server_port>/flights/flights
+    """
+    sheet = FakeSheety(rows)
+    server = ThreadingHTTPServer(("127.0.0.1", port), sheet.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, sheet
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    example_rows = [
+        {"id": 2, "city": "Paris", "iataCode": "", "price": 100},
+        {"id": 3, "city": "Rome", "iataCode": "", "price": 80},
+        {"id": 4, "city": "London", "iataCode": "", "price": 120},
+    ]
+    server, sheet = start(example_rows, port)
+    print(f"Fake Sheety running at http://127.0.0.1:{server.server_port}{SHEET_PATH}")
+    threading.Event().wait()
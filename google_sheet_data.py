@@ -1,38 +1,73 @@
 import os
-from dotenv import load_dotenv
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+import config  # loads the .env file (once per process)
+from metrics import metrics
+from circuit_breaker import guarded
 
 
-# --- Load environment variables from .env file ---
+# --- Environment variables (loaded from .env by config) ---
 # Used to hide sensitive tokens (Sheety API key)
-load_dotenv()
 SHEETY_TOKEN = os.getenv("SHEETY_AUTH_TOKEN")
 
+# Sheety endpoint for the "flights" sheet (can point to a local fake server, see fake_sheety.py)
+SHEETY_URL = os.getenv("SHEETY_URL", "https://api.sheety.co/f0b69fa7d9efb2deda9d82ae8625e7d6/flights/flights")
+
+# Local copy of the last downloaded sheet
+SNAPSHOT_FILE = os.getenv("SHEET_SNAPSHOT", "sheet_snapshot.json")
+
 
 class SheetData:
     """
     This class handles all communication with the Google Sheet
     via the Sheety API (GET and PUT requests).
+    A local snapshot of the sheet is kept, so unchanged data is not downloaded
+    again and only changed rows are written back.
     """
 
-    def __init__(self):
+    def __init__(self, base_url=SHEETY_URL, snapshot_file=SNAPSHOT_FILE):
         # Base URLs for Sheety API (GET all data and PUT updates)
-        self.sheety_get = "https://api.sheety.co/f0b69fa7d9efb2deda9d82ae8625e7d6/flights/flights"
-        self.sheety_put = "https://api.sheety.co/f0b69fa7d9efb2deda9d82ae8625e7d6/flights/flights/"
+        self.sheety_get = base_url
+        self.sheety_put = f"{base_url}/"
+        self.snapshot_file = snapshot_file
 
         # Authorization header for Sheety API
         self.auth_header = {
             "Authorization": f"Bearer {SHEETY_TOKEN}"
         }
 
+        # Pooled session, so many row updates reuse the same connection
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=10))
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=10))
+
+        # Last known sheet: {"etag": ..., "hash": ..., "data": ...}
+        self.snapshot = self._load_snapshot()
+
     def get_data(self):
         """
         Fetches all flight data from the Google Sheet via Sheety API.
+        Sends the stored ETag, so an unchanged sheet is not downloaded again (304).
         Returns the data as a JSON object.
         """
-        response = requests.get(url=self.sheety_get, headers=self.auth_header)
+        headers = dict(self.auth_header)
+        if self.snapshot.get("etag"):
+            headers["If-None-Match"] = self.snapshot["etag"]
+
+        response = guarded("sheety_get", lambda timeout: metrics.timed("sheety_get", lambda: self.session.get(
+            url=self.sheety_get, headers=headers, timeout=timeout
+        )))
+
+        if response.status_code == 304:
+            return self.snapshot["data"]
+
         response.raise_for_status()
         data = response.json()
+
+        self._save_snapshot(data, response.headers.get("ETag"), self._hash(data))
         return data
 
     def edit_rows(self, row_id, code):
@@ -41,13 +76,66 @@ class SheetData:
         :param row_id: Row ID in the Google Sheet
         :param code: IATA code for the corresponding city
         """
+        self.update_row(row_id, {"iataCode": code})
+
+    def update_row(self, row_id, fields):
+        """
+        Updates the given fields of one row in Google Sheet (by ID).
+        :param row_id: Row ID in the Google Sheet
+        :param fields: dict of column names and new values, e.g. {"iataCode": "PAR"}
+        """
         params = {
-            "flight": {
-                "iataCode": code
-            }
+            "flight": fields
         }
-        response = requests.put(url=f"{self.sheety_put}{row_id}", json=params, headers=self.auth_header)
+        response = guarded("sheety_put", lambda timeout: metrics.timed("sheety_put", lambda: self.session.put(
+            url=f"{self.sheety_put}{row_id}", json=params, headers=self.auth_header, timeout=timeout
+        )))
         response.raise_for_status()
 
+    def sync_rows(self, rows, max_workers=5):
+        """
+        Writes back only what actually changed.
+        Every row is compared with the snapshot, and only changed fields are sent.
+        Sheety updates one row per request, so all changes of a row go into one PUT
+        and the PUTs run in parallel.
+        :param rows: list of row dicts with "id" and the (new) column values
+        Returns the number of updated rows.
+        """
+        known = {row["id"]: row for row in self.snapshot.get("data", {}).get("flights", [])}
+        updates = []
+
+        for row in rows:
+            old_row = known.get(row["id"], {})
+            fields = {key: value for key, value in row.items() if key != "id" and old_row.get(key) != value}
+            if fields:
+                updates.append((row["id"], fields))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(lambda update: self.update_row(*update), updates))
+
+        # Keep the snapshot in line with the sheet
+        if updates and "data" in self.snapshot:
+            for row_id, fields in updates:
+                known.setdefault(row_id, {"id": row_id}).update(fields)
+            data = {"flights": list(known.values())}
+            self._save_snapshot(data, None, self._hash(data))
+
+        return len(updates)
+
+    # --- Snapshot helpers ---
+
+    @staticmethod
+    def _hash(data):
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
 
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_file, encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
 
+    def _save_snapshot(self, data, etag, content_hash):
+        self.snapshot = {"etag": etag, "hash": content_hash, "data": data}
+        with open(self.snapshot_file, "w", encoding="utf-8") as file:
+            json.dump(self.snapshot, file)
@@ -0,0 +1,187 @@
+# --- Per-city hotel catalog with ranked candidates ---
+# The full hotel list of a city is cached for a week (instead of fetching it again
+# for every departure date), and every offer probe is remembered per hotel:
+# how often it had rooms (per check-in weekday) and what it usually cost.
+# For each city and date the hotels are ranked once, most likely to have rooms first,
+# and offers are probed in small rounds down that list until one is found.
+# The ranking is shared by all stay lengths from the same date.
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+import config  # loads the .env file (once per process)
+from cache_store import get_store
+from response_parsing import HotelSummary
+
+HOTEL_STATS_DB = os.getenv("HOTEL_STATS_DB", "hotel_stats.sqlite")
+
+# The hotels of a city rarely change, so the catalog is fetched about once a week
+CATALOG_TTL = 7 * 24 * 3600
+
+# Hotels asked for in one offer request, and at most per city and dates
+PROBE_BATCH = 5
+PROBE_LIMIT = 20
+
+# How many probes the hotel's overall hit rate counts for in its weekday hit rate
+WEEKDAY_PRIOR = 2
+
+# Rankings and hotels found full are kept this long (about one run), so a long-running
+# process (daemon) ranks again with new statistics and probes full hotels again
+RUN_SECONDS = 600
+
+
+class HotelCatalog:
+    """
+    Hotel list per city (cached) plus offer statistics per hotel (SQLite).
+    first_offer() is a drop-in for "hotel_list + Hotel.first_offer" that probes
+    the best-ranked hotels first and learns from every answer.
+    """
+
+    def __init__(self, hotel, path=HOTEL_STATS_DB):
+        self.hotel = hotel
+        self.cache = get_store()
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS hotel_stats ("
+            " city TEXT, hotel_id TEXT, weekday INTEGER, probes INTEGER, hits INTEGER, price_total REAL,"
+            " PRIMARY KEY (city, hotel_id, weekday))"
+        )
+        self.conn.commit()
+
+        # Ranked candidates computed in this run: {(city, check-in date): (computed at, [HotelSummary])}
+        self.rankings = {}
+
+        # Hotels without rooms in this run:
+        # {(city, check-in date): (first seen at, {hotel_id: shortest stay in nights})}.
+        # No rooms for 3 nights from a date also means no rooms for 7 nights from it,
+        # so longer stays skip these hotels.
+        self.full = {}
+
+    def hotels(self, city):
+        """
+        All hotels of a city (HotelSummary), in the order the API returned them.
+        """
+        items = self.cache.get_or_fetch(
+            "hotel_catalog", city,
+            lambda: [[hotel.hotel_id, hotel.name] for hotel in self.hotel.hotel_list(city, limit=None)],
+            ttl=CATALOG_TTL
+        )
+        return [HotelSummary(hotel_id, name) for hotel_id, name in items or []]
+
+    def stats(self, city):
+        """
+        Offer statistics of a city's hotels: {hotel_id: {weekday: (probes, hits, price total)}}.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT hotel_id, weekday, probes, hits, price_total FROM hotel_stats WHERE city = ?", (city,)
+            ).fetchall()
+
+        stats = {}
+        for hotel_id, weekday, probes, hits, price_total in rows:
+            stats.setdefault(hotel_id, {})[weekday] = (probes, hits, price_total)
+        return stats
+
+    def candidates(self, city, check_in):
+        """
+        Hotels of a city ranked for one check-in date (computed once per run, see RUN_SECONDS):
+        highest chance of an offer first, then the cheaper usual price,
+        then the API order (hotels never probed keep their place).
+        """
+        key = (city, check_in)
+        with self.lock:
+            self._drop_old()
+            entry = self.rankings.get(key)
+        if entry is not None:
+            return entry[1]
+
+        hotels = self.hotels(city)
+        stats = self.stats(city)
+        weekday = datetime.strptime(check_in, "%Y-%m-%d").weekday()
+
+        def rank(item):
+            position, hotel = item
+            by_weekday = stats.get(hotel.hotel_id, {})
+            probes = sum(value[0] for value in by_weekday.values())
+            hits = sum(value[1] for value in by_weekday.values())
+            price_total = sum(value[2] for value in by_weekday.values())
+
+            # Hit rate for this weekday, pulled towards the hotel's overall rate
+            overall = (hits + 1) / (probes + 2)
+            day_probes, day_hits, _ = by_weekday.get(weekday, (0, 0, 0.0))
+            rate = (day_hits + WEEKDAY_PRIOR * overall) / (day_probes + WEEKDAY_PRIOR)
+
+            typical_price = price_total / hits if hits else float("inf")
+            return -rate, typical_price, position
+
+        ranked = [hotel for _, hotel in sorted(enumerate(hotels), key=rank)]
+        with self.lock:
+            self.rankings[key] = (time.monotonic(), ranked)
+        return ranked
+
+    def _drop_old(self):
+        """
+        Forgets rankings and full hotels older than RUN_SECONDS (called with the lock held).
+        """
+        now = time.monotonic()
+        for entries in (self.rankings, self.full):
+            for key in [key for key, (started, _) in entries.items() if now - started > RUN_SECONDS]:
+                del entries[key]
+
+    def record(self, city, hotel_id, check_in, offer):
+        """
+        Remembers one offer probe (offer None = no rooms).
+        """
+        weekday = datetime.strptime(check_in, "%Y-%m-%d").weekday()
+        try:
+            price = float(offer["total"]) if offer else 0.0
+        except (TypeError, ValueError):
+            # Offers without a usable price are not counted as hits, so they don't lower the usual price
+            offer, price = None, 0.0
+
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO hotel_stats (city, hotel_id, weekday, probes, hits, price_total)"
+                " VALUES (?, ?, ?, 1, ?, ?)"
+                " ON CONFLICT (city, hotel_id, weekday) DO UPDATE SET"
+                " probes = probes + 1, hits = hits + excluded.hits, price_total = price_total + excluded.price_total",
+                (city, hotel_id, weekday, 1 if offer else 0, price)
+            )
+            self.conn.commit()
+
+    def first_offer(self, city, check_in, check_out, limit=PROBE_LIMIT, batch_size=PROBE_BATCH):
+        """
+        Returns the offer of the best-ranked hotel that has rooms (with "hotelName" added), or None.
+        Hotels are probed `batch_size` at a time, so most flights need one small request.
+        Hotels already found full for a shorter stay from the same date are not probed.
+        """
+        nights = (datetime.strptime(check_out, "%Y-%m-%d") - datetime.strptime(check_in, "%Y-%m-%d")).days
+        with self.lock:
+            self._drop_old()
+            full = dict(self.full.get((city, check_in), (0, {}))[1])
+        ranked = [hotel for hotel in self.candidates(city, check_in) if full.get(hotel.hotel_id, nights + 1) > nights]
+        ranked = ranked[:limit]
+
+        def record(hotel_id, offer):
+            self.record(city, hotel_id, check_in, offer)
+            if offer is None:
+                with self.lock:
+                    known = self.full.setdefault((city, check_in), (time.monotonic(), {}))[1]
+                    known[hotel_id] = min(known.get(hotel_id, nights), nights)
+
+        for i in range(0, len(ranked), batch_size):
+            batch = ranked[i:i + batch_size]
+            offer = self.hotel.first_offer(
+                hotel_ids=[hotel.hotel_id for hotel in batch], check_in=check_in, check_out=check_out,
+                record=record
+            )
+            if offer:
+                names = {hotel.hotel_id: hotel.name for hotel in batch}
+                offer["hotelName"] = names.get(offer["hotelId"], "Unknown hotel name")
+                return offer
+
+        return None
@@ -1,16 +1,19 @@
 import os
-from dotenv import load_dotenv
 import requests
-
-# Load environment variables (API credentials)
-load_dotenv()
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import config  # loads the .env file (once per process)
+from amadeus_client import get_client, AMADEUS_URL
+from response_parsing import read_items, HotelSummary
 
 HOTEL_KEY = os.getenv("HOTEL_KEY")
 HOTEL_SECRET = os.getenv("HOTEL_SECRET")
 
 # Amadeus API endpoints
-HOTEL_END = "https://test.api.amadeus.com/v1/reference-data/locations/hotels/by-city"
-OFFER_END = "https://test.api.amadeus.com/v3/shopping/hotel-offers"
+HOTEL_END = f"{AMADEUS_URL}/v1/reference-data/locations/hotels/by-city"
+OFFER_END = f"{AMADEUS_URL}/v3/shopping/hotel-offers"
+
+# How many hotel IDs are sent in one hotel-offers request
+OFFER_BATCH_SIZE = 20
 
 
 class Hotel:
@@ -19,52 +22,26 @@ class Hotel:
     """
 
     def __init__(self):
-        # Endpoint for getting an access token
-        self.hotel_post = "https://test.api.amadeus.com/v1/security/oauth2/token"
-
-        # Required headers and parameters for authentication
-        self.auth_header = {
-            "Content-Type": "application/x-www-form-urlencoded"
-        }
-        self.auth_params = {
-            "grant_type": "client_credentials",
-            "client_id": HOTEL_KEY,
-            "client_secret": HOTEL_SECRET
-        }
-
-        # Access token will be stored here once retrieved
-        self.access_token = None
+        # Shared Amadeus client (pooled session, token refresh, retries, rate limit)
+        self.client = get_client(HOTEL_KEY, HOTEL_SECRET)
 
     def hotel_acc_token(self):
         """
         Retrieves the access token from the Amadeus API.
-        If the token already exists, it will reuse the stored one.
+        The client reuses the token and refreshes it shortly before it expires.
         """
-        if self.access_token is not None:
-            return self.access_token
-
-        try:
-            response = requests.post(
-                url=self.hotel_post,
-                headers=self.auth_header,
-                data=self.auth_params
-            )
-            response.raise_for_status()
-            self.access_token = response.json()["access_token"]
-            return self.access_token
-        except Exception as error:
-            print(f"Token request failed: {error}")
-            return None
+        return self.client.get_token()
 
-    def hotel_list(self, code):
+    def hotel_list(self, code, limit=10):
         """
         Fetches a list of hotels in a given city based on its IATA code.
 
         Args:
             code (str): City IATA code (e.g., 'PAR' for Paris)
+            limit (int | None): How many hotels to return (None = all of them)
 
         Returns:
-            list: A list of up to 10 hotels found in that city.
+            list: Up to `limit` hotels found in that city (HotelSummary: hotel_id, name).
         """
         params = {
             "cityCode": code,
@@ -72,17 +49,12 @@ class Hotel:
             "ratings": "3"  # Example: get 3-star hotels
         }
 
-        auth_header = {
-            "Authorization": f"Bearer {self.access_token}"
-        }
-
-        response = requests.get(url=HOTEL_END, headers=auth_header, params=params)
+        response = self.client.get(url=HOTEL_END, params=params, endpoint="hotel_list", stream=True)
         response.raise_for_status()
-        data = response.json()
 
-        # Return only the first 10 hotels to limit API usage
-        first_10 = data["data"][:10]
-        return first_10
+        # By default only the first 10 hotels, to limit API usage (the rest is not decoded)
+        items = read_items(response, "data", limit=limit)
+        return [HotelSummary.from_item(item) for item in items]
 
     def offers(self, hotel_id, check_in, check_out):
         """
@@ -94,7 +66,8 @@ class Hotel:
             check_out (str): Check-out date (YYYY-MM-DD)
 
         Returns:
-            dict | None: JSON response with offer details or None if request fails.
+            dict | None: The hotel's item from the response (hotel and offers),
+            or None if the request fails or the hotel has no offers.
         """
         params = {
             "hotelIds": [hotel_id],
@@ -103,18 +76,131 @@ class Hotel:
             "currency": "EUR"
         }
 
-        auth_header = {
-            "Authorization": f"Bearer {self.access_token}"
-        }
-
         try:
-            response = requests.get(url=OFFER_END, headers=auth_header, params=params)
+            response = self.client.get(url=OFFER_END, params=params, endpoint="hotel_offers", stream=True)
             response.raise_for_status()
-            data = response.json()
-            return data
+            items = read_items(response, "data", limit=1)
+            return items[0] if items else None
         except requests.exceptions.HTTPError:
             # Some hotels may not have available offers — return None to skip them
             return None
 
+    def offers_for(self, hotel_ids, check_in, check_out):
+        """
+        Retrieves offers for many hotels with as few requests as possible.
+        The hotel-offers endpoint accepts a list of hotel IDs, so up to
+        OFFER_BATCH_SIZE hotels are asked for in one request.
 
+        Args:
+            hotel_ids (list): Hotel IDs from Amadeus.
+            check_in (str): Check-in date (YYYY-MM-DD)
+            check_out (str): Check-out date (YYYY-MM-DD)
 
+        Returns:
+            dict | None: {hotel_id: parsed offer} for hotels that have an offer
+            (see parse_offer), or None if a batch request fails.
+        """
+        found = {}
+
+        for i in range(0, len(hotel_ids), OFFER_BATCH_SIZE):
+            batch = hotel_ids[i:i + OFFER_BATCH_SIZE]
+            params = {
+                "hotelIds": ",".join(batch),
+                "checkInDate": check_in,
+                "checkOutDate": check_out,
+                "currency": "EUR"
+            }
+
+            try:
+                response = self.client.get(url=OFFER_END, params=params, endpoint="hotel_offers", stream=True)
+                response.raise_for_status()
+                items = read_items(response, "data")
+            except requests.exceptions.HTTPError:
+                # One bad hotel ID can fail the whole batch
+                return None
+
+            for hotel_data in items:
+                offer = self.parse_offer(hotel_data, check_in, check_out)
+                if offer is not None:
+                    found[offer["hotelId"]] = offer
+
+        # Keep the same order as the given hotel IDs
+        return {hotel_id: found[hotel_id] for hotel_id in hotel_ids if hotel_id in found}
+
+    def first_offer(self, hotel_ids, check_in, check_out, max_workers=5, record=None):
+        """
+        Returns the first hotel (in list order) that has an offer for the given dates.
+        First tries one batched request. If the batch fails, asks hotels one by one
+        in parallel and returns as soon as every hotel before the first one with an offer
+        has answered; requests not started yet are cancelled and running ones are not waited for.
+        `record(hotel_id, offer or None)` is called for every hotel whose answer is known
+        (used by HotelCatalog to learn which hotels usually have rooms).
+
+        Returns:
+            dict | None: Parsed offer (see parse_offer) or None if no hotel has an offer.
+        """
+        if not hotel_ids:
+            return None
+
+        batch = self.offers_for(hotel_ids, check_in, check_out)
+        if batch is not None:
+            if record is not None:
+                for hotel_id in hotel_ids:
+                    record(hotel_id, batch.get(hotel_id))
+            return next(iter(batch.values()), None)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        jobs = {executor.submit(self.offers, hotel_id, check_in, check_out): position
+                for position, hotel_id in enumerate(hotel_ids)}
+        # Answers so far: {position in hotel_ids: offer or None}
+        answers = {}
+
+        try:
+            for job in as_completed(jobs):
+                position = jobs[job]
+                hotel_data = job.result()
+                offer = self.parse_offer(hotel_data, check_in, check_out) if hotel_data else None
+                if record is not None:
+                    record(hotel_ids[position], offer)
+                answers[position] = offer
+
+                # The same hotel wins as in a serial loop: the first one with an offer,
+                # once every hotel before it has answered without one
+                for first in range(len(hotel_ids)):
+                    if first not in answers:
+                        break
+                    if answers[first] is not None:
+                        offer = answers[first]
+                        offer["hotelId"] = offer["hotelId"] or hotel_ids[first]
+                        return offer
+        finally:
+            # Requests that have not started yet are not needed anymore
+            for job in jobs:
+                job.cancel()
+            executor.shutdown(wait=False)
+
+        return None
+
+    @staticmethod
+    def parse_offer(hotel_data, check_in, check_out):
+        """
+        Extracts the first offer of one hotel from a hotel-offers response item.
+
+        Returns:
+            dict | None: hotelId, total, currency, checkInDate and checkOutDate,
+            or None if the hotel has no offers.
+        """
+        hotel_offers = hotel_data.get("offers", [])
+        if not hotel_offers:
+            return None
+
+        first_offer = hotel_offers[0]
+        price_info = first_offer.get("price", {})
+
+        return {
+            "hotelId": hotel_data.get("hotel", {}).get("hotelId"),
+            "total": price_info.get("total", "N/A"),
+            "currency": price_info.get("currency", "EUR"),
+            "checkInDate": first_offer.get("checkInDate", check_in),
+            "checkOutDate": first_offer.get("checkOutDate", check_out)
+        }
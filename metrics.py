@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+import config  # loads the .env file (once per process)
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+# Default output files
+METRICS_JSON = "metrics.json"
+METRICS_PROM = "metrics.prom"
+
+
+class Metrics:
+    """
+    Collects numbers about one run:
+      - latency histogram, status codes and bytes received per endpoint
+      - retries per endpoint
+      - requests skipped by an open circuit breaker, per endpoint
+      - cache hits and misses per cache
+      - time spent in every pipeline stage
+    When disabled, every method returns right away, so the overhead is one `if`.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.latency = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+        self.latency_sum = defaultdict(float)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.bytes = defaultdict(int)
+        self.retries = defaultdict(int)
+        self.skipped = defaultdict(int)
+        self.cache = defaultdict(lambda: {"hit": 0, "miss": 0})
+        self.stage_time = defaultdict(float)
+        self.stage_items = defaultdict(int)
+        self.started = time.time()
+
+    def timed(self, endpoint, send, stream=False):
+        """
+        Calls `send()` (an outbound request) and records its latency, status and size.
+        For streamed responses (stream=True) the size comes from Content-Length, so the
+        body is not downloaded here (it is read item by item by response_parsing).
+        Returns what `send()` returns.
+        """
+        if not self.enabled:
+            return send()
+
+        start = time.perf_counter()
+        try:
+            response = send()
+        except Exception:
+            self.record_request(endpoint, time.perf_counter() - start, "error", 0)
+            raise
+
+        status = getattr(response, "status_code", "ok")
+        if stream:
+            size = int(response.headers.get("Content-Length") or 0)
+        else:
+            content = getattr(response, "content", None)
+            size = len(content) if content else 0
+        self.record_request(endpoint, time.perf_counter() - start, status, size)
+        return response
+
+    def record_request(self, endpoint, seconds, status, size):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.latency[endpoint][bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            self.latency_sum[endpoint] += seconds
+            self.statuses[endpoint][str(status)] += 1
+            self.bytes[endpoint] += size
+
+    def record_retry(self, endpoint):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.retries[endpoint] += 1
+
+    def record_skip(self, endpoint):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.skipped[endpoint] += 1
+
+    def record_cache(self, cache, hit):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.cache[cache]["hit" if hit else "miss"] += 1
+
+    def record_stage(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.stage_time[stage] += seconds
+            self.stage_items[stage] += 1
+
+    # --- Export ---
+
+    def summary(self):
+        """
+        Returns all collected numbers as a dict.
+        """
+        with self.lock:
+            endpoints = {}
+            for endpoint, counts in self.latency.items():
+                total = sum(counts)
+                endpoints[endpoint] = {
+                    "requests": total,
+                    "avg_latency": round(self.latency_sum[endpoint] / total, 4) if total else 0,
+                    "latency_buckets": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], counts)),
+                    "statuses": dict(self.statuses[endpoint]),
+                    "bytes": self.bytes[endpoint],
+                    "retries": self.retries.get(endpoint, 0),
+                }
+
+            return {
+                "run_seconds": round(time.time() - self.started, 3),
+                "endpoints": endpoints,
+                "retries": dict(self.retries),
+                "skipped": dict(self.skipped),
+                "cache": {name: dict(counts) for name, counts in self.cache.items()},
+                "stages": {
+                    stage: {"seconds": round(self.stage_time[stage], 3), "items": self.stage_items[stage]}
+                    for stage in self.stage_time
+                },
+            }
+
+    def prometheus(self):
+        """
+        Returns the metrics in Prometheus text format.
+        """
+        lines = [
+            "# HELP flight_request_duration_seconds Latency of outbound API requests.",
+            "# TYPE flight_request_duration_seconds histogram",
+        ]
+        with self.lock:
+            for endpoint, counts in sorted(self.latency.items()):
+                cumulative = 0
+                for bound, count in zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], counts):
+                    cumulative += count
+                    lines.append(f'flight_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+                lines.append(f'flight_request_duration_seconds_sum{{endpoint="{endpoint}"}} {self.latency_sum[endpoint]:.6f}')
+                lines.append(f'flight_request_duration_seconds_count{{endpoint="{endpoint}"}} {cumulative}')
+
+            lines += ["# HELP flight_requests_total Outbound API requests by status.", "# TYPE flight_requests_total counter"]
+            for endpoint, statuses in sorted(self.statuses.items()):
+                for status, count in sorted(statuses.items()):
+                    lines.append(f'flight_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+            lines += ["# HELP flight_response_bytes_total Bytes received per endpoint.", "# TYPE flight_response_bytes_total counter"]
+            for endpoint, size in sorted(self.bytes.items()):
+                lines.append(f'flight_response_bytes_total{{endpoint="{endpoint}"}} {size}')
+
+            lines += ["# HELP flight_request_retries_total Retried requests per endpoint.", "# TYPE flight_request_retries_total counter"]
+            for endpoint, count in sorted(self.retries.items()):
+                lines.append(f'flight_request_retries_total{{endpoint="{endpoint}"}} {count}')
+
+            lines += ["# HELP flight_requests_skipped_total Requests skipped by an open circuit breaker.", "# TYPE flight_requests_skipped_total counter"]
+            for endpoint, count in sorted(self.skipped.items()):
+                lines.append(f'flight_requests_skipped_total{{endpoint="{endpoint}"}} {count}')
+
+            lines += ["# HELP flight_cache_requests_total Cache lookups by result.", "# TYPE flight_cache_requests_total counter"]
+            for cache, counts in sorted(self.cache.items()):
+                for result, count in sorted(counts.items()):
+                    lines.append(f'flight_cache_requests_total{{cache="{cache}",result="{result}"}} {count}')
+
+            lines += ["# HELP flight_stage_seconds_total Time spent in each pipeline stage.", "# TYPE flight_stage_seconds_total counter"]
+            for stage, seconds in sorted(self.stage_time.items()):
+                lines.append(f'flight_stage_seconds_total{{stage="{stage}"}} {seconds:.6f}')
+
+            lines += ["# HELP flight_stage_items_total Items processed by each pipeline stage.", "# TYPE flight_stage_items_total counter"]
+            for stage, count in sorted(self.stage_items.items()):
+                lines.append(f'flight_stage_items_total{{stage="{stage}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path=METRICS_JSON, prom_path=METRICS_PROM):
+        """
+        Writes the JSON summary and the Prometheus file.
+        """
+        with open(json_path, "w", encoding="utf-8") as file:
+            json.dump(self.summary(), file, indent=2)
+        with open(prom_path, "w", encoding="utf-8") as file:
+            file.write(self.prometheus())
+
+
+# Shared instance for the whole process (enabled with METRICS=1 or main.py --metrics)
+metrics = Metrics(enabled=os.getenv("METRICS") == "1")
@@ -1,25 +1,61 @@
 import os
-from twilio.rest import Client
-from dotenv import load_dotenv
+import threading
+import config  # loads the .env file (once per process)
+from metrics import metrics
 
 class WhatsAppNotifier:
     def __init__(self):
-        """Initialize Twilio WhatsApp client using environment variables."""
-        load_dotenv()
+        """Initialize Twilio WhatsApp settings using environment variables."""
         self.account_sid = os.getenv("TWILIO_SID")
         self.auth_token = os.getenv("TWILIO_AUTH")
         self.my_number = os.getenv("PHONE")
-        self.client = Client(self.account_sid, self.auth_token)
         self.sender = "whatsapp:+14155238886"  # Twilio Sandbox number
+        # The Twilio client is created on the first send (importing twilio is slow)
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Twilio client, created (and twilio imported) only when a message is sent."""
+        with self._client_lock:
+            if self._client is None:
+                from twilio.rest import Client
+                self._client = Client(self.account_sid, self.auth_token)
+                # Optional base URL for the Twilio API (e.g. a local fake server, see fake_api_server.py)
+                if os.getenv("TWILIO_URL"):
+                    self._client.api.base_url = os.getenv("TWILIO_URL")
+            return self._client
 
     def send_message(self, message):
-        """Send a WhatsApp message to the configured phone number."""
+        """Send a WhatsApp message to the configured phone number. Returns True on success."""
         try:
-            msg = self.client.messages.create(
+            msg = metrics.timed("twilio", lambda: self.client.messages.create(
                 from_=self.sender,
                 to=f"whatsapp:{self.my_number}",
                 body=message
-            )
+            ))
             print(f"Message sent successfully! SID: {msg.sid}")
+            return True
         except Exception as e:
             print(f"Error sending WhatsApp message: {e}")
+            return False
+
+
+class StubNotifier:
+    """Local stand-in for WhatsAppNotifier: keeps messages in a list instead of sending them."""
+
+    def __init__(self, fail_times=0):
+        self.sent = []
+        # Number of sends that fail before the first success (to try out retries)
+        self.fail_times = fail_times
+
+    def send_message(self, message):
+        """Store the message (or fail, while fail_times > 0). Returns True on success."""
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            print("Error sending WhatsApp message: stub failure")
+            return False
+
+        self.sent.append(message)
+        print(f"Message stored by stub ({len(message)} characters).")
+        return True
@@ -0,0 +1,509 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from metrics import metrics
+from date_planner import stay_lengths
+from deadline import run_deadline, DeadlineExceeded
+import circuit_breaker
+
+# Marks the end of the work in a queue
+DONE = object()
+
+# How long (seconds) a hotel lookup is shared by other flights to the same city and dates.
+# Long enough for one run; the resident daemon gets a fresh lookup after that.
+HOTEL_SHARE_SECONDS = 600
+
+# Default number of worker threads for every stage
+DEFAULT_WORKERS = {
+    "resolve": 4,
+    "flights": 5,
+    "weather": 4,
+    "hotels": 3,
+    "notify": 1,
+}
+
+
+class Stage:
+    """
+    One step of the pipeline.
+    Worker threads take items from the input queue, call `func(item)`,
+    and put every result it yields into the output queue.
+    Queues are bounded, so a slow stage makes the faster ones wait (backpressure).
+    """
+
+    def __init__(self, name, func, workers, queue_size):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.input = queue.Queue(maxsize=queue_size)
+        self.output = None  # Input queue of the next stage
+        self.next_workers = 0
+        self.threads = []
+
+    def start(self):
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _work(self):
+        while True:
+            item = self.input.get()
+            if item is DONE:
+                return
+
+            start = time.perf_counter()
+            try:
+                for result in self.func(item):
+                    if self.output is not None:
+                        self.output.put(result)
+            except circuit_breaker.CircuitOpenError:
+                # Counted by the breaker and reported at the end of the run
+                pass
+            except DeadlineExceeded:
+                run_deadline.skip(f"{self.name} items")
+            except Exception as e:
+                print(f"Error in {self.name} stage: {e}")
+            metrics.record_stage(self.name, time.perf_counter() - start)
+
+    def finish(self):
+        """
+        Waits until all input is processed, then tells the next stage there is no more work.
+        """
+        for _ in range(self.workers):
+            self.input.put(DONE)
+        for thread in self.threads:
+            thread.join()
+        if self.output is not None:
+            for _ in range(self.next_workers):
+                self.output.put(DONE)
+
+
+class Pipeline:
+    """
+    Runs the whole search as stages connected by bounded queues:
+      resolve (city → IATA code) → flights (one query per day) → weather (score)
+      → hotels (first offer) → notify (collect deals into a WhatsApp digest)
+    Every stage works at the same time, so a flight goes to weather scoring
+    while later days are still being searched.
+    With several stay lengths, every flight is scored once per length (from one
+    weather window) and each good stay gets its own hotel lookup.
+    With several origins, only flight searches are repeated per origin;
+    destination work (coordinates, weather, hotels) is done once and shared.
+    Close to the run deadline (see deadline.py) no new destinations or flight searches
+    are started, and after it only found deals are still sent.
+    """
+
+    def __init__(self, flight_data, weather, hotel, digest,
+                 days=7, stay_days=7, min_score=3.5, workers=None, queue_size=50, planner=None, state=None,
+                 origins=None, archive=None, catalog=None, incremental=True):
+        self.flight_data = flight_data
+        self.weather = weather
+        self.hotel = hotel
+        self.digest = digest
+
+        self.days = days
+        # Stay lengths in nights (one int or several), shortest first
+        self.stay_days = stay_lengths(stay_days)
+        self.min_score = min_score
+        self.workers = dict(DEFAULT_WORKERS, **(workers or {}))
+        self.queue_size = queue_size
+
+        # Origin airports to search from (None → FlightData default)
+        self.origins = origins or [None]
+
+        # Hotel offers looked up recently: {(city, check in, check out): (started at, Future)}
+        self.hotel_results = {}
+
+        # Optional DatePlanner: searches flights only on dates with good weather
+        self.planner = planner
+
+        # Optional StateStore: with incremental=True it reuses fresh results and reports changes;
+        # otherwise every observation is fetched and only recorded (e.g. for the quota planner's history)
+        self.state = state
+        self.incremental = incremental and state is not None
+        self.changes = []
+        self.reused = 0
+
+        # Counts days left to search per destination (to report destinations without flights)
+        self.days_left = {}
+        self.flights_found = {}
+        self.lock = threading.Lock()
+
+        # Messages of new deals found during the run
+        self.messages = []
+
+        # Optional HotelCatalog: cached hotel lists, best-ranked hotels are probed first
+        self.catalog = catalog
+
+        # Optional PriceArchive: keeps every flight price, weather score and hotel total
+        self.archive = archive
+
+    def run(self, sheet_rows):
+        """
+        Runs the pipeline for the rows from the Google Sheet (each has 'city' and 'price').
+        Returns the list of messages for new deals (sent as a digest in the background).
+        """
+        with self.lock:
+            self.hotel_results.clear()
+
+        stages = [
+            Stage("resolve", self.resolve, self.workers["resolve"], self.queue_size),
+            Stage("flights", self.search, self.workers["flights"], self.queue_size),
+            Stage("weather", self.score, self.workers["weather"], self.queue_size),
+            Stage("hotels", self.find_hotel, self.workers["hotels"], self.queue_size),
+            Stage("notify", self.notify, self.workers["notify"], self.queue_size),
+        ]
+
+        # Connect every stage to the next one
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.output = next_stage.input
+            stage.next_workers = next_stage.workers
+
+        for stage in stages:
+            stage.start()
+
+        for row in sheet_rows:
+            stages[0].input.put(row)
+
+        # Stages are finished in order, each one after its input is done
+        for stage in stages:
+            stage.finish()
+
+        if self.planner is not None:
+            self.planner.report()
+
+        if self.incremental:
+            self.report_changes()
+
+        if self.archive is not None:
+            self.archive.flush()
+
+        run_deadline.report()
+        circuit_breaker.report()
+
+        # Send all new deals at once, without waiting for Twilio here
+        self.digest.flush()
+
+        return self.messages
+
+    # --- Stage functions (each one yields items for the next stage) ---
+
+    def resolve(self, row):
+        """
+        City name → one flight query per day (only good-weather days when a planner is used).
+        """
+        if run_deadline.near():
+            run_deadline.skip("destinations")
+            return
+
+        code = self.flight_data.get_iata_codes(row["city"].upper())
+        if code is None:
+            print(f"{row['city']}: IATA code not found")
+            return
+
+        if self.planner is not None:
+            dates = self.planner.plan(code)
+            if not dates:
+                print(f"No dates with good weather for {code}")
+                return
+        else:
+            dates = self.flight_data.search_dates(self.days)
+
+        with self.lock:
+            self.days_left[code] = self.days_left.get(code, 0) + len(dates) * len(self.origins)
+            self.flights_found.setdefault(code, 0)
+
+        for date in dates:
+            for origin in self.origins:
+                yield origin, code, row["price"], date
+
+    def search(self, query):
+        """
+        (origin, code, price, date) → flight, if there is one for that day.
+        """
+        origin, code, price, date = query
+
+        if run_deadline.near():
+            run_deadline.skip("flight searches")
+            return
+
+        # A failed search raises (and is handled by the stage), so it is never stored,
+        # archived or counted as "no flight that day"
+        flight, previous, fetched = self.observe(
+            "flight", self.flight_key(origin, code, price, date),
+            lambda: self.search_day(origin, code, price, date)
+        )
+        if flight is not None and previous is None:
+            self.change(f"New flight: {code} on {flight['departureDate']} for {flight['price']} EUR")
+        elif flight is not None and float(flight["price"]) < float(previous["price"]):
+            self.change(f"Price drop: {code} on {flight['departureDate']} {previous['price']} → {flight['price']} EUR")
+
+        with self.lock:
+            # Single checks (see check) are not counted per destination
+            no_flights = False
+            if code in self.days_left:
+                self.days_left[code] -= 1
+                if flight is not None:
+                    self.flights_found[code] += 1
+                no_flights = self.days_left[code] == 0 and self.flights_found[code] == 0
+
+        if no_flights:
+            print(f"There are no flights for {code}")
+
+        # Only values that were really searched now go into the archive (not reused ones)
+        if fetched and flight is not None:
+            self.record("flight", flight["origin"], code, flight["departureDate"], flight["price"])
+        elif fetched:
+            # No flight under the sheet price – used for the sheet price suggestions
+            self.record("flight_miss", origin, code, date, price)
+
+        if flight is not None:
+            yield flight
+
+    def check(self, query):
+        """
+        Runs one (origin, code, price, date) query through all stages right away,
+        without queues (used by the scheduler daemon). Returns the found deals.
+        """
+        deals = []
+        for flight in self.search(query):
+            for item in self.score(flight):
+                for deal in self.find_hotel(item):
+                    deals.append(deal)
+                    list(self.notify(deal))
+        return deals
+
+    @staticmethod
+    def flight_key(origin, code, price, date):
+        """
+        Key of a flight observation in the state store.
+        """
+        return f"{origin or ''}|{code}|{date.strftime('%Y-%m-%d')}|{price}"
+
+    def search_day(self, origin, code, price, date):
+        """
+        Searches one day from one origin (None → FlightData's default origin).
+        Errors (including an open circuit) are raised, not returned as "no flight".
+        """
+        if origin is None:
+            return self.flight_data.search_day(code, price, date, raise_errors=True)
+        return self.flight_data.search_day(code, price, date, origin=origin, raise_errors=True)
+
+    def score(self, flight):
+        """
+        Flight → (flight, dates, score) for every stay length with good enough weather.
+        All stay lengths are scored from one conditions window (the longest stay).
+        """
+        if run_deadline.passed():
+            run_deadline.skip("weather checks")
+            return
+
+        departure_date = datetime.strptime(flight["departureDate"], "%Y-%m-%d")
+        start_date = departure_date.strftime("%Y-%m-%d")
+        last_date = (departure_date + timedelta(days=self.stay_days[-1])).strftime("%Y-%m-%d")
+
+        # --- Get geographic coordinates for weather data ---
+        geo_location = self.location(flight)
+
+        # Conditions are fetched only if a stay length is not in the state store
+        conditions = []
+
+        def stay_score(nights):
+            if not conditions:
+                conditions.extend(self.weather.get_conditions(location=geo_location, date1=start_date, date2=last_date))
+            return self.weather.score_conditions(conditions[:nights + 1])
+
+        for nights in self.stay_days:
+            end_date = (departure_date + timedelta(days=nights)).strftime("%Y-%m-%d")
+
+            # --- Get weather and calculate score ---
+            score, previous, fetched = self.observe(
+                "weather", f"{geo_location}|{start_date}|{end_date}", lambda: stay_score(nights)
+            )
+            if previous is not None and (previous >= self.min_score) != (score >= self.min_score):
+                self.change(f"Weather flip: {flight['cityCode']} from {start_date} ({nights} nights): {previous} → {score}")
+            if fetched:
+                self.record("weather", None, flight["cityCode"], start_date, score, nights)
+            print(f"\n✈️ Flight: {flight['cityCode']} | {nights} nights | Weather score: {score}")
+
+            if score >= self.min_score:
+                yield flight, start_date, end_date, score
+            else:
+                print(" Bad weather – skip this stay.")
+
+    def location(self, flight):
+        """
+        "lat,lon" used for a flight's weather: the destination city's coordinates, the same
+        location DatePlanner scores (so both use one timeline), or the arrival airport's
+        if the city can't be found.
+        """
+        for code in (flight["cityCode"], flight["airport"]):
+            location_data = self.flight_data.get_coordinate(airport=code)
+            if location_data and location_data.get("data"):
+                geo_code = location_data["data"][0]["geoCode"]
+                return f'{geo_code["latitude"]},{geo_code["longitude"]}'
+        raise ValueError(f"No coordinates for {flight['cityCode']} / {flight['airport']}")
+
+    def find_hotel(self, item):
+        """
+        Good-weather flight → deal with the first hotel that has an offer.
+        """
+        flight, start_date, end_date, score = item
+
+        if run_deadline.passed():
+            run_deadline.skip("hotel lookups")
+            return
+
+        offer, previous, fetched = self.observe(
+            "hotel", f"{flight['cityCode']}|{start_date}|{end_date}",
+            lambda: self.shared_hotel_offer(flight["cityCode"], start_date, end_date)
+        )
+
+        if not offer:
+            print(" No available offers from hotels.")
+            return
+
+        if fetched:
+            nights = (datetime.strptime(end_date, "%Y-%m-%d") - datetime.strptime(start_date, "%Y-%m-%d")).days
+            self.record("hotel", None, flight["cityCode"], start_date, offer["total"], nights)
+
+        if previous is None:
+            self.change(f"New hotel offer: {offer['hotelName']} in {flight['cityCode']} from {start_date}")
+
+        name = offer["hotelName"]
+        print(f"Pronađena ponuda za hotel: {name} ({offer['hotelId']})")
+
+        yield {
+            "flight": flight,
+            "offer": offer,
+            "hotelName": name,
+            "score": score,
+            "message": build_message(flight, offer, name, score)
+        }
+
+    def shared_hotel_offer(self, city_code, start_date, end_date):
+        """
+        Looks up the hotel offer for a city and dates only once per run
+        (HOTEL_SHARE_SECONDS), even when flights from several origins arrive on the same day.
+        """
+        key = (city_code, start_date, end_date)
+        now = time.monotonic()
+        with self.lock:
+            # Old lookups are dropped, so they are never reused as fresh results
+            for old_key in [k for k, (started, f) in self.hotel_results.items() if now - started > HOTEL_SHARE_SECONDS]:
+                del self.hotel_results[old_key]
+
+            entry = self.hotel_results.get(key)
+            owner = entry is None
+            if owner:
+                future = Future()
+                self.hotel_results[key] = (now, future)
+            else:
+                future = entry[1]
+
+        if owner:
+            try:
+                future.set_result(self.hotel_offer(city_code, start_date, end_date))
+            except Exception as error:
+                future.set_exception(error)
+
+        offer = future.result()
+        return dict(offer) if offer else offer
+
+    def hotel_offer(self, city_code, start_date, end_date):
+        """
+        Returns the first hotel offer in a city (with "hotelName" added), or None.
+        """
+        if self.catalog is not None:
+            return self.catalog.first_offer(city_code, start_date, end_date)
+
+        hotel_list = self.hotel.hotel_list(city_code)
+        hotel_names = {hotel.hotel_id: hotel.name for hotel in hotel_list}
+
+        offer = self.hotel.first_offer(
+            hotel_ids=[hotel.hotel_id for hotel in hotel_list], check_in=start_date, check_out=end_date
+        )
+        if offer:
+            offer["hotelName"] = hotel_names.get(offer["hotelId"], "Unknown hotel name")
+        return offer
+
+    def notify(self, deal):
+        """
+        Adds the deal to the digest (skipped if it was already sent in an earlier run).
+        """
+        if self.digest.add(deal):
+            with self.lock:
+                self.messages.append(deal["message"])
+        else:
+            print(f"Deal for {deal['flight']['cityCode']} was already sent – skipping.")
+        yield from ()
+
+    def record(self, kind, origin, destination, date, value, nights=0):
+        """
+        Adds an observation to the price archive (if one is used).
+        """
+        if self.archive is not None:
+            self.archive.add(kind, origin, destination, date, value, nights)
+
+    # --- Incremental mode helpers ---
+
+    def observe(self, source, key, fetch):
+        """
+        Returns (value, previous value, True if `fetch()` was called) for an observation.
+        Without a state store this just calls `fetch()`. Outside incremental mode the
+        value is always fetched and only recorded. In incremental mode fresh stored values
+        are reused (previous is then the same value, so no change is reported).
+        """
+        if self.state is None:
+            return fetch(), None, True
+
+        if not self.incremental:
+            value = fetch()
+            self.state.record(source, key, value)
+            return value, None, True
+
+        value, previous, reused = self.state.lookup(source, key, fetch)
+        if reused:
+            with self.lock:
+                self.reused += 1
+            return value, value, False
+        return value, previous, True
+
+    def change(self, text):
+        """
+        Remembers a change since the last run (new deal, price drop, weather flip).
+        """
+        if not self.incremental:
+            return
+        with self.lock:
+            self.changes.append(text)
+
+    def report_changes(self):
+        """
+        Prints what changed since the last run.
+        """
+        print(f"\nIncremental run: {self.reused} result(s) reused from earlier runs.")
+        if not self.changes:
+            print("No changes since the last run.")
+        for text in self.changes:
+            print(f" {text}")
+
+
+def build_message(flight, offer, name, score):
+    """
+    Formats the WhatsApp message for a found deal.
+    """
+    return (
+        f" *Good destination found!*\n\n"
+        f" From: *{flight['origin']}*\n"
+        f" City: *{flight['cityCode']}*\n"
+        f" Airport: *{flight['airport']}*\n"
+        f" Flight Price: *{flight['price']} EUR*\n"
+        f" Dates: {offer['checkInDate']} → {offer['checkOutDate']}\n"
+        f" Hotel: *{name}*\n"
+        f" Price: {offer['total']} {offer['currency']}\n"
+        f" Weather score: *{score}*\n"
+    )
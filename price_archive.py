@@ -0,0 +1,389 @@
+# --- Price history archive ---
+# Every run appends what it saw (flight prices, weather scores, hotel totals) to a
+# compact columnar archive on disk, instead of printing it once and losing it:
+#   price_archive/chunk-<time>-<pid>/   one chunk per run (or flush)
+#     kind.npy, origin.npy, destination.npy, date.npy, observed.npy, value.npy, nights.npy
+#     codes.json                        dictionary for the origin/destination columns
+# Every flush also compacts the archive: chunks written on the same day are merged
+# into one, and chunks of earlier months into one per month, so queries open few files.
+# Dates are stored as days since 2000-01-01 and airport/city codes as small integers.
+# Queries memory-map the columns, so even years of history are read quickly.
+
+import os
+import json
+import time
+import shutil
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date as Date, datetime, timedelta
+import numpy as np
+import config  # loads the .env file (once per process)
+
+PRICE_ARCHIVE = os.getenv("PRICE_ARCHIVE", "price_archive")
+
+# What a value means, per kind: flight price (EUR), weather score, hotel total (EUR),
+# and for searches that found no flight: the maxPrice (EUR) they were sent with
+KINDS = {"flight": 0, "weather": 1, "hotel": 2, "flight_miss": 3}
+
+# Dates are stored as uint16 days since this day (enough until the year 2179)
+DATE_EPOCH = Date(2000, 1, 1)
+
+# Column types of every chunk
+COLUMNS = {
+    "kind": np.uint8,
+    "origin": np.uint16,
+    "destination": np.uint16,
+    "date": np.uint16,        # departure / check-in date
+    "observed": np.uint16,    # day the value was seen
+    "value": np.float32,
+    "nights": np.uint8,       # stay length of weather scores and hotel totals (0 for flights)
+}
+
+# Sheet price suggestions: searches of the last RECENT_DAYS days are used; with fewer than
+# MIN_SAMPLES of them there is no suggestion. When less than TARGET_HIT_RATE of them found
+# a flight at the current sheet price, the price is raised by RAISE_STEP.
+RECENT_DAYS = 30
+MIN_SAMPLES = 5
+TARGET_HIT_RATE = 0.3
+RAISE_STEP = 0.1
+
+
+def day_number(value):
+    """
+    "YYYY-MM-DD" (or date/datetime) → days since DATE_EPOCH.
+    """
+    if isinstance(value, str):
+        value = datetime.strptime(value[:10], "%Y-%m-%d")
+    if isinstance(value, datetime):
+        value = value.date()
+    return (value - DATE_EPOCH).days
+
+
+def day_string(number):
+    """
+    Days since DATE_EPOCH → "YYYY-MM-DD".
+    """
+    return (DATE_EPOCH + timedelta(days=int(number))).strftime("%Y-%m-%d")
+
+
+class PriceArchive:
+    """
+    Append-only columnar archive with a few analytics queries.
+    Writing: add() collects rows in memory, flush() writes them as a new chunk.
+    Reading: columns() memory-maps all chunks; the query methods build on it.
+    """
+
+    def __init__(self, path=PRICE_ARCHIVE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.rows = []
+
+    # --- Writing ---
+
+    def add(self, kind, origin, destination, date, value, nights=0):
+        """
+        Adds one observation (written on the next flush).
+        - kind: "flight", "weather" or "hotel"
+        - origin: origin airport ("" when it doesn't apply, e.g. weather)
+        - destination: destination city code
+        - date: departure / check-in date ("YYYY-MM-DD" or date)
+        - value: price or score (values that are not numbers are skipped)
+        - nights: stay length the value is for (weather, hotel); 0 when it doesn't apply
+        Rows without a destination (e.g. a city that has no IATA code) are skipped.
+        """
+        if not destination:
+            return
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return
+
+        row = (KINDS[kind], origin or "", destination, day_number(date), day_number(datetime.now()), value, nights)
+        with self.lock:
+            self.rows.append(row)
+
+    def flush(self):
+        """
+        Writes the collected rows as a new chunk. Returns the number of rows written.
+        """
+        with self.lock:
+            rows, self.rows = self.rows, []
+        # The same value seen twice on the same day (e.g. one weather score for flights
+        # from several origins) is kept once, so it doesn't weigh more in the queries
+        rows = list(dict.fromkeys(rows))
+        if not rows:
+            return 0
+
+        self._write_chunk(rows, f"chunk-{time.time_ns()}-{os.getpid()}")
+        self.compact()
+        return len(rows)
+
+    def _write_chunk(self, rows, name):
+        """
+        Writes rows (kind number, origin, destination, date, observed, value, nights) as the chunk `name`.
+        """
+        kinds, origins, destinations, dates, observed, values, nights = zip(*rows)
+
+        # Dictionary for this chunk: code → small integer (in order of first use)
+        codes = list(dict.fromkeys(str(code) for code in origins + destinations))
+        index = {code: number for number, code in enumerate(codes)}
+
+        self._write_columns(codes, {
+            "kind": kinds,
+            "origin": [index[str(code)] for code in origins],
+            "destination": [index[str(code)] for code in destinations],
+            "date": dates,
+            "observed": observed,
+            "value": values,
+            "nights": nights,
+        }, name)
+
+    def _write_columns(self, codes, columns, name):
+        """
+        Writes the columns and code dictionary of one chunk.
+        Written to a temporary folder first, so readers never see half a chunk.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        temp_dir = os.path.join(self.path, f".{name}")
+        os.makedirs(temp_dir)
+        for column, dtype in COLUMNS.items():
+            np.save(os.path.join(temp_dir, f"{column}.npy"), np.asarray(columns[column], dtype=dtype))
+        with open(os.path.join(temp_dir, "codes.json"), "w", encoding="utf-8") as file:
+            json.dump(codes, file)
+        os.rename(temp_dir, os.path.join(self.path, name))
+
+    def compact(self):
+        """
+        Merges the chunks written on the same day (this month) or in the same month (earlier
+        months) into one chunk each. Returns the number of chunks that were merged away.
+        """
+        this_month = datetime.now().strftime("%Y-%m")
+        merged = 0
+
+        with self._file_lock():
+            groups = {}
+            for chunk in self.chunks():
+                # chunk-<time_ns>-...: the time the (first) rows were written
+                written = datetime.fromtimestamp(int(os.path.basename(chunk).split("-")[1]) / 1e9)
+                month = written.strftime("%Y-%m")
+                groups.setdefault(written.strftime("%Y-%m-%d") if month == this_month else month, []).append(chunk)
+
+            for chunks in groups.values():
+                if len(chunks) < 2:
+                    continue
+                # The merged chunk sorts where the first one did; the old ones are removed after
+                # it is written (a query running meanwhile may count some rows twice, never lose them)
+                first = os.path.basename(chunks[0]).split("-")[1]
+                self._merge(chunks, f"chunk-{first}-merged{time.time_ns()}")
+                for chunk in chunks:
+                    shutil.rmtree(chunk, ignore_errors=True)
+                merged += len(chunks) - 1
+
+        return merged
+
+    def _merge(self, chunks, name):
+        """
+        Writes the rows of several chunks as one new chunk `name`.
+        """
+        codes, index = [], {}
+        parts = {column: [] for column in COLUMNS}
+
+        for chunk in chunks:
+            with open(os.path.join(chunk, "codes.json"), encoding="utf-8") as file:
+                chunk_codes = json.load(file)
+            for code in chunk_codes:
+                if code not in index:
+                    index[code] = len(codes)
+                    codes.append(code)
+            remap = np.array([index[code] for code in chunk_codes], dtype=np.uint16)
+
+            arrays = self._load_columns(chunk)
+            for column in COLUMNS:
+                values = np.asarray(arrays[column])
+                parts[column].append(remap[values] if column in ("origin", "destination") else values)
+
+        self._write_columns(codes, {column: np.concatenate(values) for column, values in parts.items()}, name)
+
+    @contextmanager
+    def _file_lock(self):
+        """
+        Holds an exclusive lock shared by all processes writing the archive (a SQLite lock file).
+        """
+        os.makedirs(self.path, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self.path, ".lock"), timeout=60, isolation_level=None)
+        try:
+            conn.execute("BEGIN EXCLUSIVE")
+            yield
+        finally:
+            conn.close()
+
+    # --- Reading ---
+
+    def chunks(self):
+        """
+        Paths of all finished chunks, oldest first.
+        """
+        if not os.path.isdir(self.path):
+            return []
+        return [os.path.join(self.path, name) for name in sorted(os.listdir(self.path)) if name.startswith("chunk-")]
+
+    def columns(self, kind="flight"):
+        """
+        Returns (codes, columns) for one kind of observation:
+        - codes: list of code strings (the dictionary of the origin/destination columns)
+        - columns: {column name: NumPy array}, rows of all chunks together
+        """
+        codes, index = [], {}
+        parts = {column: [] for column in COLUMNS if column != "kind"}
+
+        for chunk in self.chunks():
+            try:
+                with open(os.path.join(chunk, "codes.json"), encoding="utf-8") as file:
+                    chunk_codes = json.load(file)
+                arrays = self._load_columns(chunk)
+            except FileNotFoundError:
+                # Merged into a newer chunk meanwhile (see compact)
+                continue
+
+            # Chunk code numbers → archive-wide code numbers
+            for code in chunk_codes:
+                if code not in index:
+                    index[code] = len(codes)
+                    codes.append(code)
+            remap = np.array([index[code] for code in chunk_codes], dtype=np.uint16)
+
+            mask = arrays["kind"] == KINDS[kind]
+            if not mask.any():
+                continue
+            for column in parts:
+                values = arrays[column][mask]
+                parts[column].append(remap[values] if column in ("origin", "destination") else values)
+
+        columns = {
+            column: np.concatenate(values) if values else np.empty(0, dtype=COLUMNS[column])
+            for column, values in parts.items()
+        }
+        return codes, columns
+
+    @staticmethod
+    def _load_columns(chunk):
+        """
+        Memory-maps the columns of one chunk (chunks from before the nights column get zeros).
+        """
+        arrays = {}
+        for column in COLUMNS:
+            path = os.path.join(chunk, f"{column}.npy")
+            if column == "nights" and not os.path.exists(path):
+                arrays[column] = np.zeros(len(arrays["kind"]), dtype=COLUMNS[column])
+            else:
+                arrays[column] = np.load(path, mmap_mode="r")
+        return arrays
+
+    def select(self, kind="flight", origin=None, destination=None, nights=None):
+        """
+        Returns {column: array} for the observations of one route (None = any).
+        Weather scores and hotel totals differ per stay length, so pass `nights` to not mix them.
+        """
+        codes, columns = self.columns(kind)
+        mask = np.ones(len(columns["value"]), dtype=bool)
+
+        for column, code in (("origin", origin), ("destination", destination)):
+            if code is None:
+                continue
+            if code not in codes:
+                mask[:] = False
+            else:
+                mask &= columns[column] == codes.index(code)
+
+        if nights is not None:
+            mask &= columns["nights"] == nights
+
+        return {column: values[mask] for column, values in columns.items()}
+
+    # --- Queries ---
+
+    def min_by_date(self, origin, destination, kind="flight", nights=None):
+        """
+        Lowest value ever seen per departure date: {"YYYY-MM-DD": min}.
+        """
+        rows = self.select(kind, origin, destination, nights)
+        if not len(rows["value"]):
+            return {}
+
+        order = np.argsort(rows["date"], kind="stable")
+        dates, values = rows["date"][order], rows["value"][order]
+        unique_dates, starts = np.unique(dates, return_index=True)
+        minimums = np.minimum.reduceat(values, starts)
+        return {day_string(day): round(float(value), 2) for day, value in zip(unique_dates, minimums)}
+
+    def cheapest_weeks(self, origin, destination, limit=5):
+        """
+        Weeks (starting on Monday) with the lowest flight price ever seen.
+        Returns a list of ("YYYY-MM-DD" of the Monday, min price), cheapest first.
+        """
+        rows = self.select("flight", origin, destination)
+        if not len(rows["value"]):
+            return []
+
+        # DATE_EPOCH (2000-01-01) was a Saturday, so Monday-based weeks start 2 days later
+        weeks = (rows["date"].astype(np.int64) - 2) // 7
+        unique_weeks, inverse = np.unique(weeks, return_inverse=True)
+        minimums = np.full(len(unique_weeks), np.inf)
+        np.minimum.at(minimums, inverse, rows["value"])
+
+        best = np.argsort(minimums, kind="stable")[:limit]
+        return [(day_string(unique_weeks[i] * 7 + 2), round(float(minimums[i]), 2)) for i in best]
+
+    def percentiles(self, origin, destination, q=(10, 25, 50, 75, 90), kind="flight", nights=None):
+        """
+        Percentiles of all observed values for a route: {percentile: value}.
+        """
+        values = self.select(kind, origin, destination, nights)["value"]
+        if not len(values):
+            return {}
+        return {p: round(float(v), 2) for p, v in zip(q, np.percentile(values, q))}
+
+    def trend(self, origin, destination, days=30):
+        """
+        How the lowest daily price of a route changed over the last `days` days
+        of observations, in EUR per day (negative = getting cheaper).
+        Returns None with fewer than two observation days.
+        """
+        rows = self.select("flight", origin, destination)
+        if not len(rows["value"]):
+            return None
+
+        recent = rows["observed"] >= rows["observed"].max() - days
+        observed, values = rows["observed"][recent], rows["value"][recent]
+        unique_days, inverse = np.unique(observed, return_inverse=True)
+        if len(unique_days) < 2:
+            return None
+
+        minimums = np.full(len(unique_days), np.inf)
+        np.minimum.at(minimums, inverse, values)
+        slope = np.polyfit(unique_days.astype(np.float64), minimums, 1)[0]
+        return round(float(slope), 2)
+
+    def suggest_threshold(self, destination, current_price, days=RECENT_DAYS):
+        """
+        Suggested sheet price for a destination (any origin).
+        Flights are searched with the sheet price as maxPrice, so the archive never shows
+        whether a lower price would still find flights: the price is never lowered, only
+        raised when too few recent searches found a flight at the current price.
+        Returns the current price when it works, None without enough history.
+        """
+        since = day_number(datetime.now()) - days
+        found = self.select("flight", None, destination)
+        missed = self.select("flight_miss", None, destination)
+
+        # A flight under a lower price would also be found at the current price,
+        # and no flight under a higher maxPrice means none under the current one either
+        hits = int(np.count_nonzero((found["observed"] >= since) & (found["value"] <= current_price)))
+        misses = int(np.count_nonzero((missed["observed"] >= since) & (missed["value"] >= current_price)))
+        if hits + misses < MIN_SAMPLES:
+            return None
+
+        if hits / (hits + misses) >= TARGET_HIT_RATE:
+            return int(round(current_price))
+        return int(round(current_price * (1 + RAISE_STEP)))
@@ -0,0 +1,119 @@
+import os
+import time
+import config  # loads the .env file (once per process)
+from weather_data import HORIZON_DAYS
+
+# Calls left for this run per API (from the daily quota); None = no limit
+BUDGETS = {
+    "amadeus": int(os.getenv("AMADEUS_BUDGET")) if os.getenv("AMADEUS_BUDGET") else None,
+    "weather": int(os.getenv("WEATHER_BUDGET")) if os.getenv("WEATHER_BUDGET") else None,
+}
+
+# A destination that was checked this long ago (seconds) counts as fully "stale"
+STALE_AFTER = 24 * 3600
+
+
+class QuotaPlanner:
+    """
+    Chooses which destinations to search when the API quotas can't cover the whole sheet.
+    For every destination it estimates the calls it needs and how likely it is to give
+    a deal (from earlier runs), and then picks destinations with the best value per call
+    until the budget is used up.
+    """
+
+    def __init__(self, flight_data, state, budgets=None, days=7, origins=None, cache=None, stay_days=7):
+        self.flight_data = flight_data
+        self.state = state
+        self.budgets = dict(BUDGETS, **(budgets or {}))
+        self.days = days
+        # Longest stay in nights (one int or several lengths)
+        self.longest_stay = stay_days if isinstance(stay_days, int) else max(stay_days)
+        self.origins = origins or [None]
+        self.cache = cache if cache is not None else flight_data.cache
+
+    def estimate_calls(self, code, hit_rate):
+        """
+        Estimated calls per API for one destination:
+        days × origins flight searches + coordinates + hotels for expected deals, and
+        one weather timeline (planner and pipeline share it), plus one more when the
+        stays reach past the forecast horizon (unless the climatology can answer them).
+        Cached city coordinates and hotel catalogs cost nothing.
+        """
+        searches = len(self.flight_data.search_dates(self.days)) * len(self.origins)
+        coordinates = 0 if self.cache.get("coordinates", code) is not None else 1
+        hotel_list = 0 if self.cache.get("hotel_catalog", code) is not None else 1
+        expected_flights = searches * hit_rate
+
+        return {
+            # flight offers + coordinates + hotel catalog + hotel offers per expected flight
+            "amadeus": searches + coordinates + hotel_list + round(expected_flights),
+            "weather": 1 + (1 if self.days + self.longest_stay > HORIZON_DAYS else 0),
+        }
+
+    def history(self, code):
+        """
+        Past flight observations for a destination: (hit rate, lowest price, last check time).
+        """
+        observations = self.state.search("flight", f"%|{code}|%")
+        if not observations:
+            return None, None, None
+
+        found = [value for value, observed_at in observations if value]
+        # Laplace smoothing, so one lucky (or unlucky) run doesn't decide everything
+        hit_rate = (len(found) + 1) / (len(observations) + 2)
+        lowest = min((float(value["price"]) for value in found), default=None)
+        last_check = max(observed_at for value, observed_at in observations)
+        return hit_rate, lowest, last_check
+
+    def expected_value(self, row, code):
+        """
+        How much a search of this destination is worth:
+          hit rate × (1 + margin between the sheet price and past prices) × staleness
+        Destinations never checked before get a neutral value.
+        Returns (value, hit rate).
+        """
+        hit_rate, lowest, last_check = self.history(code)
+        if hit_rate is None:
+            return 0.5, 0.5
+
+        margin = 0
+        if lowest is not None and row["price"]:
+            margin = max(float(row["price"]) - lowest, 0) / float(row["price"])
+
+        staleness = min((time.time() - last_check) / STALE_AFTER, 1)
+        return hit_rate * (1 + margin) * staleness, hit_rate
+
+    def plan(self, sheet_rows):
+        """
+        Returns the sheet rows to search, best value per call first,
+        that together fit in the budgets. Prints a short summary.
+        """
+        remaining = dict(self.budgets)
+        candidates = []
+        for index, row in enumerate(sheet_rows):
+            # Resolving a city that is not cached yet also uses one Amadeus call
+            if remaining["amadeus"] is not None and self.cache.get("iata", row["city"].upper()) is None:
+                remaining["amadeus"] -= 1
+            code = self.flight_data.get_iata_codes(row["city"].upper())
+            if code is None:
+                continue
+            value, hit_rate = self.expected_value(row, code)
+            calls = self.estimate_calls(code, hit_rate)
+            cost = max(sum(calls.values()), 1)
+            candidates.append((-value / cost, index, row, calls, value))
+
+        candidates.sort(key=lambda item: (item[0], item[1]))
+
+        plan = []
+        for _, index, row, calls, value in candidates:
+            fits = all(remaining[api] is None or remaining[api] >= count for api, count in calls.items())
+            if not fits:
+                continue
+            for api, count in calls.items():
+                if remaining[api] is not None:
+                    remaining[api] -= count
+            plan.append(row)
+
+        print(f"Quota plan: {len(plan)} of {len(sheet_rows)} destinations fit the budget "
+              f"({', '.join(f'{api}: {left} calls left' for api, left in remaining.items() if left is not None)}).")
+        return plan
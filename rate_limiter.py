@@ -0,0 +1,127 @@
+import os
+import sqlite3
+import threading
+import time
+import config  # loads the .env file (once per process)
+from deadline import run_deadline, DeadlineExceeded
+
+
+# Allowed requests per second for each API we talk to.
+# Amadeus test environment allows about 10 requests per second, so we stay below it.
+# AMADEUS_RATE can change it (e.g. for benchmarks against a local fake server).
+API_RATES = {
+    "amadeus": float(os.getenv("AMADEUS_RATE", 5)),
+}
+
+# SQLite file for limits shared by several processes (set by work_queue.py workers)
+SHARED_RATE_DB = os.getenv("SHARED_RATE_DB")
+
+
+class RateLimiter:
+    """
+    Simple token-bucket rate limiter.
+    Tokens are refilled at `rate` per second up to `capacity`.
+    Every request takes one token, and waits when the bucket is empty.
+    One limiter can be shared between many threads.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until one token is available and takes it.
+        Raises DeadlineExceeded if the token would come after the run deadline.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                # Time until the next token is ready
+                wait = (1 - self.tokens) / self.rate
+
+            if not run_deadline.sleep(wait):
+                raise DeadlineExceeded("no rate-limit token before the run deadline")
+
+
+class SharedRateLimiter:
+    """
+    Token bucket stored in SQLite, so several worker processes share one limit.
+    Every acquire() is a short write transaction that refills and takes a token.
+    """
+
+    def __init__(self, path, api, rate, capacity=None):
+        self.path = path
+        self.api = api
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS buckets (api TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+        self.conn.execute(
+            "INSERT OR IGNORE INTO buckets (api, tokens, updated) VALUES (?, ?, ?)",
+            (api, self.capacity, time.time())
+        )
+
+    def acquire(self):
+        """
+        Blocks until one token is available (in any process) and takes it.
+        Raises DeadlineExceeded if the token would come after the run deadline.
+        """
+        while True:
+            with self.lock:
+                self.conn.execute("BEGIN IMMEDIATE")
+                try:
+                    tokens, updated = self.conn.execute(
+                        "SELECT tokens, updated FROM buckets WHERE api = ?", (self.api,)
+                    ).fetchone()
+                    now = time.time()
+                    tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+
+                    if tokens >= 1:
+                        tokens -= 1
+                        wait = 0
+                    else:
+                        wait = (1 - tokens) / self.rate
+
+                    self.conn.execute(
+                        "UPDATE buckets SET tokens = ?, updated = ? WHERE api = ?", (tokens, now, self.api)
+                    )
+                    self.conn.execute("COMMIT")
+                except Exception:
+                    self.conn.execute("ROLLBACK")
+                    raise
+
+            if wait == 0:
+                return
+            if not run_deadline.sleep(wait):
+                raise DeadlineExceeded("no rate-limit token before the run deadline")
+
+
+# One shared limiter per API, created on first use
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(api):
+    """
+    Returns the shared RateLimiter for the given API name (e.g. "amadeus").
+    When SHARED_RATE_DB is set, the limit is shared with other processes.
+    """
+    with _limiters_lock:
+        if api not in _limiters:
+            if SHARED_RATE_DB:
+                _limiters[api] = SharedRateLimiter(SHARED_RATE_DB, api, rate=API_RATES[api])
+            else:
+                _limiters[api] = RateLimiter(rate=API_RATES[api])
+        return _limiters[api]
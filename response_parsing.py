@@ -0,0 +1,213 @@
+# --- Fast, selective decoding of API responses ---
+# Flight-offer and hotel responses are big, but we only use a few fields of the
+# first items in "data". This module:
+#   - decodes small responses at once with orjson (if installed, else the json module)
+#   - reads large responses as a stream and stops as soon as the needed items are read
+#     (the rest of the body, e.g. the flight "dictionaries", is never decoded)
+#   - keeps the extracted fields in small slotted records instead of nested dicts
+
+import re
+import json
+import codecs
+
+try:
+    import orjson
+except ImportError:
+    # Optional: `pip install orjson` makes decoding several times faster
+    orjson = None
+
+# Responses smaller than this (bytes, from Content-Length) are decoded in one go
+STREAM_THRESHOLD = 64 * 1024
+
+# Size of the pieces read from a streamed response
+CHUNK_SIZE = 16 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"\s*")
+_NUMBER_CHARS = "0123456789.eE+-"
+
+
+def loads(content):
+    """
+    Decodes JSON text (bytes or str) with the fastest available parser.
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def read_items(response, key="data", limit=None):
+    """
+    Returns up to `limit` items of the top-level list `key` of a JSON response.
+    Small (or unknown-size) responses are decoded at once, large ones are streamed.
+    The response should be requested with stream=True, otherwise it is already in memory.
+    """
+    length = response.headers.get("Content-Length")
+    if length is None or int(length) < STREAM_THRESHOLD:
+        items = loads(response.content).get(key) or []
+        return items[:limit] if limit is not None else items
+
+    return list(iter_items(response, key, limit))
+
+
+def iter_items(response, key="data", limit=None):
+    """
+    Streams the items of the top-level list `key` of a JSON object response,
+    one decoded item at a time. Stops reading after `limit` items.
+    Other top-level values are decoded only when they come before `key`.
+    """
+    reader = _StreamReader(response.iter_content(CHUNK_SIZE))
+    try:
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+
+        while True:
+            name = reader.value()
+            reader.expect(":")
+
+            if name == key and reader.peek() == "[":
+                reader.pos += 1
+                if reader.peek() == "]":
+                    return
+                count = 0
+                while True:
+                    yield reader.value()
+                    count += 1
+                    if limit is not None and count >= limit:
+                        return
+                    if reader.separator("]"):
+                        return
+            else:
+                reader.value()
+
+            if reader.separator("}"):
+                return
+    finally:
+        # Stops the download (the connection is not reused if the body was not read to the end)
+        response.close()
+
+
+class _StreamReader:
+    """
+    Reads JSON values one by one from a stream of byte chunks.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.done = False
+
+    def more(self):
+        """
+        Appends the next chunk to the buffer (dropping what was already read).
+        Returns False at the end of the stream.
+        """
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.buffer = self.buffer[self.pos:] + self.utf8.decode(b"", final=True)
+            self.pos = 0
+            self.done = True
+            return False
+
+        self.buffer = self.buffer[self.pos:] + self.utf8.decode(chunk)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Returns the next non-whitespace character ("" at the end of the stream).
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.more():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Invalid JSON: expected {char!r} at position {self.pos}")
+        self.pos += 1
+
+    def separator(self, closing):
+        """
+        Reads "," (returns False) or the closing bracket (returns True).
+        """
+        char = self.peek()
+        if char not in (",", closing):
+            raise ValueError(f"Invalid JSON: expected ',' or {closing!r} at position {self.pos}")
+        self.pos += 1
+        return char == closing
+
+    def value(self):
+        """
+        Decodes the next complete JSON value, reading more chunks when needed.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # A number cut at the end of the buffer (e.g. "1e-" of "1e-06") continues in the next chunk
+                if self.done or (end < len(self.buffer) and self.buffer[end] not in _NUMBER_CHARS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.done:
+                    raise
+            self.more()
+
+
+class FlightOffer:
+    """
+    The fields of one flight offer that the app uses.
+    """
+
+    __slots__ = ("airport", "departure_date", "departure_time", "price")
+
+    def __init__(self, airport, departure_date, departure_time, price):
+        self.airport = airport
+        self.departure_date = departure_date
+        self.departure_time = departure_time
+        self.price = price
+
+    @classmethod
+    def from_item(cls, item):
+        """
+        Builds the record from one item of a flight-offers response.
+        """
+        segments = item["itineraries"][0]["segments"]
+        departure_date, departure_time = segments[0]["departure"]["at"].split("T")
+        return cls(segments[-1]["arrival"]["iataCode"], departure_date, departure_time,
+                   item["price"]["grandTotal"])
+
+    def as_dict(self, city_code, origin):
+        """
+        Flight dict used by the rest of the app (pipeline, state, digest).
+        """
+        return {
+            "airport": self.airport,
+            "departureDate": self.departure_date,
+            "departureTime": self.departure_time,
+            "price": self.price,
+            "cityCode": city_code,
+            "origin": origin
+        }
+
+
+class HotelSummary:
+    """
+    A hotel from the hotel-list response: only its ID and name.
+    """
+
+    __slots__ = ("hotel_id", "name")
+
+    def __init__(self, hotel_id, name):
+        self.hotel_id = hotel_id
+        self.name = name
+
+    @classmethod
+    def from_item(cls, item):
+        return cls(item["hotelId"], item.get("name", "Unknown hotel name"))
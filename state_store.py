@@ -0,0 +1,110 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+import config  # loads the .env file (once per process)
+
+# Local SQLite file with every flight, weather and hotel observation
+STATE_DB = os.getenv("STATE_DB", "state.sqlite")
+
+# How long (seconds) an observation is fresh enough to be reused, per source
+SOURCE_TTLS = {
+    "flight": 3600,        # flight prices change often
+    "weather": 6 * 3600,   # forecasts are updated a few times a day
+    "hotel": 3 * 3600,     # hotel availability
+}
+
+
+class StateStore:
+    """
+    Remembers what earlier runs have seen.
+    Every observation (flight price, weather score, hotel offer) is stored with
+    a timestamp, so a later run can reuse fresh results instead of calling the API
+    again, and can tell what changed since the last check.
+    """
+
+    def __init__(self, path=STATE_DB, ttls=None):
+        self.path = path
+        # Freshness per source (SOURCE_TTLS, with optional overrides)
+        self.ttls = dict(SOURCE_TTLS, **(ttls or {}))
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS observations ("
+            " source TEXT, key TEXT, value TEXT, observed_at REAL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS observations_key ON observations (source, key, observed_at)"
+        )
+        self.conn.commit()
+
+    def record(self, source, key, value):
+        """
+        Stores a new observation (value can be None, e.g. "no flight that day").
+        """
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO observations (source, key, value, observed_at) VALUES (?, ?, ?, ?)",
+                (source, key, json.dumps(value), time.time())
+            )
+            self.conn.commit()
+
+    def latest(self, source, key):
+        """
+        Returns (value, observed_at) of the newest observation, or None if there is none.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, observed_at FROM observations WHERE source = ? AND key = ?"
+                " ORDER BY observed_at DESC LIMIT 1",
+                (source, key)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def history(self, source, key, limit=20):
+        """
+        Returns the newest observations as a list of (value, observed_at), newest first.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT value, observed_at FROM observations WHERE source = ? AND key = ?"
+                " ORDER BY observed_at DESC LIMIT ?",
+                (source, key, limit)
+            ).fetchall()
+
+        return [(json.loads(value), observed_at) for value, observed_at in rows]
+
+    def search(self, source, pattern, limit=1000):
+        """
+        Returns observations whose key matches an SQL LIKE pattern (e.g. "%|PAR|%"),
+        as a list of (value, observed_at), newest first.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT value, observed_at FROM observations WHERE source = ? AND key LIKE ?"
+                " ORDER BY observed_at DESC LIMIT ?",
+                (source, pattern, limit)
+            ).fetchall()
+
+        return [(json.loads(value), observed_at) for value, observed_at in rows]
+
+    def lookup(self, source, key, fetch):
+        """
+        Returns a fresh observation, calling `fetch()` only when the stored one is stale.
+
+        Returns:
+            tuple: (value, previous value or None, True if the stored value was reused)
+        """
+        latest = self.latest(source, key)
+
+        if latest is not None and time.time() - latest[1] < self.ttls[source]:
+            return latest[0], latest[0], True
+
+        value = fetch()
+        self.record(source, key, value)
+        previous = latest[0] if latest is not None else None
+        return value, previous, False
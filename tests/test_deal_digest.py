@@ -0,0 +1,88 @@
+import pytest
+import cache_store
+import deal_digest
+from cache_store import CacheStore
+from deal_digest import DealDigest, MAX_MESSAGE_LENGTH, SEND_RETRIES
+from notification import StubNotifier
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    # Every test gets its own cache (sent deals are remembered there) and no retry waits
+    monkeypatch.setattr(cache_store, "_store", CacheStore(str(tmp_path / "cache.sqlite")))
+    monkeypatch.setattr(deal_digest, "RETRY_DELAY", 0)
+
+
+def make_deal(city="PAR", price=100, check_in="2026-11-01", message_length=50):
+    return {
+        "flight": {"origin": "BEG", "cityCode": city, "airport": city, "price": str(price)},
+        "offer": {"checkInDate": check_in, "checkOutDate": "2026-11-08"},
+        "hotelName": "Hotel",
+        "score": 4.5,
+        "message": f"{city} {check_in} {price}".ljust(message_length, "."),
+    }
+
+
+def test_same_deal_in_one_price_band_is_added_once():
+    digest = DealDigest(StubNotifier())
+
+    assert digest.add(make_deal(price=101))
+    assert not digest.add(make_deal(price=109))
+    assert digest.add(make_deal(price=111))
+    assert digest.add(make_deal(check_in="2026-11-02"))
+
+
+def test_sent_deals_are_skipped_in_later_runs():
+    notifier = StubNotifier()
+    digest = DealDigest(notifier)
+    digest.add(make_deal())
+    assert digest.flush().result() == 1
+    digest.close()
+
+    later = DealDigest(notifier)
+    assert not later.add(make_deal())
+
+
+def test_dry_run_does_not_mark_deals_as_sent():
+    digest = DealDigest(StubNotifier(), dry_run=True)
+    digest.add(make_deal())
+    digest.flush().result()
+    digest.close()
+
+    assert DealDigest(StubNotifier()).add(make_deal())
+
+
+def test_long_digests_are_split_under_the_message_limit():
+    notifier = StubNotifier()
+    digest = DealDigest(notifier)
+    deals = [make_deal(check_in=f"2026-11-{day:02d}", message_length=500) for day in range(1, 11)]
+    for deal in deals:
+        digest.add(deal)
+
+    sent = digest.flush().result()
+    digest.close()
+
+    assert sent == len(notifier.sent) > 1
+    assert all(len(message) <= MAX_MESSAGE_LENGTH for message in notifier.sent)
+    # Every deal is in exactly one message, in order
+    assert [deal["message"] for text, part in DealDigest.build_messages(deals) for deal in part] == \
+        [deal["message"] for deal in deals]
+
+
+def test_failed_sends_are_retried():
+    notifier = StubNotifier(fail_times=SEND_RETRIES - 1)
+    digest = DealDigest(notifier)
+    digest.add(make_deal())
+
+    assert digest.flush().result() == 1
+    digest.close()
+    assert len(notifier.sent) == 1
+
+
+def test_undeliverable_deals_are_not_marked_as_sent():
+    digest = DealDigest(StubNotifier(fail_times=SEND_RETRIES))
+    digest.add(make_deal())
+
+    assert digest.flush().result() == 0
+    digest.close()
+    assert DealDigest(StubNotifier()).add(make_deal())
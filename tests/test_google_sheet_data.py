@@ -0,0 +1,55 @@
+import pytest
+import fake_sheety
+from google_sheet_data import SheetData
+
+ROWS = [
+    {"id": 2, "city": "Paris", "iataCode": "", "price": 100},
+    {"id": 3, "city": "Rome", "iataCode": "", "price": 80},
+    {"id": 4, "city": "London", "iataCode": "LON", "price": 120},
+]
+
+
+@pytest.fixture
+def sheety(tmp_path):
+    server, sheet = fake_sheety.start(ROWS)
+    url = f"http://127.0.0.1:{server.server_port}{fake_sheety.SHEET_PATH}"
+    yield SheetData(base_url=url, snapshot_file=str(tmp_path / "snapshot.json")), sheet
+    server.shutdown()
+    server.server_close()
+
+
+def test_unchanged_sheet_is_not_downloaded_again(sheety):
+    data, sheet = sheety
+
+    first = data.get_data()
+    second = data.get_data()
+
+    assert first == second == {"flights": ROWS}
+    assert sheet.gets == 2 and sheet.not_modified == 1
+
+
+def test_sync_rows_sends_only_changed_rows(sheety):
+    data, sheet = sheety
+    data.get_data()
+
+    rows = [
+        {"id": 2, "iataCode": "PAR"},    # changed
+        {"id": 3, "iataCode": ""},       # same as in the sheet
+        {"id": 4, "iataCode": "LON"},    # same as in the sheet
+    ]
+    assert data.sync_rows(rows) == 1
+    assert sheet.puts == 1
+    assert sheet.rows[2]["iataCode"] == "PAR"
+
+    # The snapshot follows the sheet, so the same rows are not sent again
+    assert data.sync_rows(rows) == 0
+    assert sheet.puts == 1
+
+
+def test_sync_rows_sends_all_changed_fields_of_a_row_in_one_put(sheety):
+    data, sheet = sheety
+    data.get_data()
+
+    assert data.sync_rows([{"id": 3, "iataCode": "ROM", "price": 90}]) == 1
+    assert sheet.puts == 1
+    assert sheet.rows[3] == {"id": 3, "city": "Rome", "iataCode": "ROM", "price": 90}
@@ -0,0 +1,86 @@
+import json
+import random
+import pytest
+from response_parsing import iter_items, read_items, STREAM_THRESHOLD
+
+
+class FakeResponse:
+    """
+    Streamed response whose body arrives in pieces of `chunk_size` bytes.
+    """
+
+    def __init__(self, body, chunk_size):
+        self.body = body
+        self.chunk_size = chunk_size
+        self.headers = {"Content-Length": str(len(body))}
+        self.closed = False
+
+    def iter_content(self, chunk_size=None):
+        for start in range(0, len(self.body), self.chunk_size):
+            yield self.body[start:start + self.chunk_size]
+
+    @property
+    def content(self):
+        return self.body
+
+    def close(self):
+        self.closed = True
+
+
+def random_value(rng, depth=0):
+    kind = rng.randrange(7 if depth < 3 else 4)
+    if kind == 0:
+        return rng.choice([True, False, None])
+    if kind == 1:
+        return rng.randint(-10 ** 6, 10 ** 6)
+    if kind == 2:
+        return round(rng.uniform(-1e4, 1e4), rng.randint(0, 6))
+    if kind == 3:
+        return "".join(rng.choice('abc "\\/\n€ž日😀') for _ in range(rng.randint(0, 12)))
+    if kind == 4:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {f"k{i}é": random_value(rng, depth + 1) for i in range(rng.randint(0, 4))}
+
+
+def payloads():
+    rng = random.Random(7)
+    for _ in range(100):
+        document = {"meta": random_value(rng), "data": [random_value(rng) for _ in range(rng.randint(0, 6))]}
+        if rng.random() < 0.5:
+            document["dictionaries"] = random_value(rng)
+        yield document, json.dumps(document, ensure_ascii=rng.random() < 0.3).encode("utf-8")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 100000])
+def test_iter_items_same_at_any_chunk_size(chunk_size):
+    for document, body in payloads():
+        assert list(iter_items(FakeResponse(body, chunk_size))) == document["data"]
+
+
+def test_iter_items_limit_stops_early():
+    body = json.dumps({"data": [{"price": 1.5}, {"price": 2}, {"price": 3}], "rest": "x"}).encode()
+    response = FakeResponse(body, 5)
+
+    assert list(iter_items(response, limit=2)) == [{"price": 1.5}, {"price": 2}]
+    assert response.closed
+
+
+def test_iter_items_splits_numbers_and_utf8_across_chunks():
+    body = '{"data": [12345.678e-2, "Beograd – Niš €", -0.5]}'.encode("utf-8")
+    for chunk_size in range(1, len(body) + 1):
+        assert list(iter_items(FakeResponse(body, chunk_size))) == [12345.678e-2, "Beograd – Niš €", -0.5]
+
+
+def test_iter_items_empty_and_missing_lists():
+    assert list(iter_items(FakeResponse(b'{"data": []}', 3))) == []
+    assert list(iter_items(FakeResponse(b'{}', 3))) == []
+    assert list(iter_items(FakeResponse(b'{"errors": [1, 2]}', 3))) == []
+
+
+def test_read_items_small_and_streamed_agree():
+    items = [{"id": i, "name": "Hôtel €"} for i in range(2000)]
+    body = json.dumps({"data": items}).encode("utf-8")
+    assert len(body) >= STREAM_THRESHOLD
+
+    assert read_items(FakeResponse(body, 4096), limit=3) == items[:3]
+    assert read_items(FakeResponse(json.dumps({"data": items[:5]}).encode(), 4096)) == items[:5]
@@ -0,0 +1,36 @@
+import random
+from weather_scoring import BatchScorer, average_score, day_score
+
+CONDITIONS = [
+    "Clear", "Sunny", "Partially cloudy", "Overcast", "Rain", "Rain, Overcast", "Snow, Rain",
+    "Showers", "Fog", "Thunderstorm", "Storm, Clear", "Variable", "",
+]
+
+
+def test_day_score_takes_the_worst_keyword():
+    assert day_score("Rain, Overcast") == 2
+    assert day_score("Storm, Clear") == 0
+    assert day_score("Variable") == 3
+
+
+def test_window_scores_match_average_score():
+    scorer = BatchScorer()
+    rng = random.Random(1)
+
+    for _ in range(200):
+        timeline = [rng.choice(CONDITIONS) for _ in range(rng.randint(1, 40))]
+        windows = sorted({rng.randint(1, 20) for _ in range(3)})
+
+        scores = scorer.multi_window_scores(timeline, windows)
+        for window in windows:
+            expected = [average_score(timeline[start:start + window]) for start in range(len(timeline) - window + 1)]
+            assert list(scores[window]) == expected
+
+
+def test_batch_scores_every_timeline():
+    scorer = BatchScorer()
+    timelines = {"a": ["Clear"] * 10, "b": ["Rain"] * 3}
+
+    scores = scorer.batch(timelines, 7)
+    assert list(scores["a"]) == [5.0] * 4
+    assert len(scores["b"]) == 0
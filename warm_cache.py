@@ -0,0 +1,38 @@
+# --- Warm up the reference-data cache ---
+# Preloads IATA codes and city coordinates for every city in the Google Sheet,
+# so the next run of main.py does not need any reference-data API calls.
+# Weather (planner and pipeline) is looked up at the city's coordinates, not the
+# arrival airport's, so city codes are all that needs warming; an airport is only
+# looked up when its city has no coordinates (reported below).
+# Usage: python warm_cache.py
+
+from concurrent.futures import ThreadPoolExecutor
+from google_sheet_data import SheetData
+from amadeus_flight_data import FlightData
+
+
+def warm_up(sheet_data, flight_data):
+    """
+    Resolves IATA codes and coordinates for all sheet cities and stores them in the cache.
+    Returns the list of IATA codes (None for cities that were not found).
+    """
+    city_names = [item['city'].upper() for item in sheet_data['flights']]
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        iata_codes = list(executor.map(flight_data.get_iata_codes, city_names))
+        found = [code for code in iata_codes if code is not None]
+        coordinates = list(executor.map(flight_data.get_coordinate, found))
+
+    for code, location_data in zip(found, coordinates):
+        if not location_data or not location_data.get("data"):
+            print(f"{code}: no city coordinates – runs will look up its arrival airports instead")
+
+    return iata_codes
+
+
+if __name__ == "__main__":
+    sheet_data = SheetData().get_data()
+    codes = warm_up(sheet_data, FlightData())
+
+    for city, code in zip([item['city'] for item in sheet_data['flights']], codes):
+        print(f"{city}: {code if code else 'not found'}")
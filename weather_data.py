@@ -1,25 +1,62 @@
 import os
+import atexit
+import threading
+import time
 import requests
-from dotenv import load_dotenv
-
-# Load environment variables (API key)
-load_dotenv()
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import config  # loads the .env file (once per process)
+from cache_store import get_store
+from climatology import get_climatology
+from weather_scoring import average_score
+from metrics import metrics
+from circuit_breaker import guarded
+
+# API key (from .env, loaded by config)
 API_KEY = os.getenv("WEATHER_API")
 
+# Visual Crossing base URL (can point to a local fake server, see fake_api_server.py)
+WEATHER_URL = os.getenv("WEATHER_URL", "https://weather.visualcrossing.com")
+
+# Visual Crossing gives a real forecast for about 15 days ahead
+HORIZON_DAYS = 15
+
+# Forecasts change, so cached timelines are refreshed after a few hours
+FORECAST_TTL = 6 * 3600
+
+# How many location timelines are kept in memory
+MEMORY_CACHE_SIZE = 128
+
 
 class Weather:
     """
     The Weather class handles fetching and evaluating weather data for a given location
     and time period using the Visual Crossing Weather API.
+
+    One timeline (today .. today + HORIZON_DAYS) is fetched per location and cached
+    in memory and on disk. Every requested window is then sliced from that timeline.
+    Days beyond the horizon come from the local climatology (see climatology.py)
+    when it has enough data for the location, so far-out windows cost no API call.
     """
 
     def __init__(self):
         # API endpoint for weather data
-        self.weather_endpoint = "https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline"
+        self.weather_endpoint = f"{WEATHER_URL}/VisualCrossingWebServices/rest/services/timeline"
         self.api_key = API_KEY
         # Stores daily weather condition strings (e.g., "Partially cloudy", "Rain")
         self.weather_conditions = []
 
+        # Timelines {location: (expires at, {date: conditions})}: in-memory LRU + persistent cache.
+        # Memory entries expire together with their disk entry (FORECAST_TTL), so a
+        # long-running process (daemon) gets fresh forecasts too.
+        self.timelines = OrderedDict()
+        self.lock = threading.Lock()
+        self.cache = get_store()
+
+        # Normals for dates beyond the forecast horizon, saved when the program exits
+        self.climatology = get_climatology()
+        atexit.register(self.climatology.save)
+
     def get_weather(self, location, date1, date2):
         """
         Fetches weather conditions between two dates for a given location.
@@ -27,26 +64,132 @@ class Weather:
         - date1: start date (YYYY-MM-DD)
         - date2: end date (YYYY-MM-DD)
         """
-        self.weather_conditions = []
+        self.weather_conditions = self.get_conditions(location, date1, date2)
 
+    def get_conditions(self, location, date1, date2):
+        """
+        Returns the list of daily conditions between two dates (both included).
+        Days beyond the forecast horizon are taken from the climatology when possible.
+        The API is called only when the window is not covered by a cached timeline.
+        """
+        key = self._location_key(location)
+        horizon = (datetime.now() + timedelta(days=HORIZON_DAYS)).strftime("%Y-%m-%d")
+
+        if date2 > horizon:
+            first_far = max(date1, (datetime.now() + timedelta(days=HORIZON_DAYS + 1)).strftime("%Y-%m-%d"))
+            normals = self.climatology.normals(key, first_far, date2)
+            metrics.record_cache("climatology", hit=normals is not None)
+            if normals is not None:
+                near = self._forecast_conditions(key, date1, horizon) if date1 <= horizon else []
+                return near + normals
+
+        return self._forecast_conditions(key, date1, date2)
+
+    def _forecast_conditions(self, key, date1, date2):
+        """
+        Returns daily conditions from the (cached) forecast timeline of a location.
+        """
+        timeline = self._get_timeline(key)
+        conditions = self._slice(timeline, date1, date2)
+
+        if conditions is None:
+            # Window goes outside the cached horizon — fetch it and merge it in.
+            # The merged timeline expires with the cached one, so its older days are not kept longer.
+            timeline = dict(timeline)
+            timeline.update(self._fetch_timeline(key, date1, date2))
+            expires_at = self.cache.expires_at("weather", key) or time.time() + FORECAST_TTL
+            self.cache.set("weather", key, timeline, ttl=max(expires_at - time.time(), 0))
+            self._remember(key, timeline, expires_at)
+            conditions = self._slice(timeline, date1, date2) or []
+
+        return conditions
+
+    @staticmethod
+    def _location_key(location):
+        """
+        Rounds "lat,lon" to 2 decimals (about 1 km), so nearby airports share a timeline.
+        """
+        lat, lon = location.split(",")
+        return f"{round(float(lat), 2)},{round(float(lon), 2)}"
+
+    def _get_timeline(self, key):
+        """
+        Returns the timeline for a location from memory, disk, or the API (in that order).
+        """
+        with self.lock:
+            entry = self.timelines.get(key)
+            if entry is not None and entry[0] > time.time():
+                self.timelines.move_to_end(key)
+                metrics.record_cache("weather_memory", hit=True)
+                return entry[1]
+
+        metrics.record_cache("weather_memory", hit=False)
+
+        start = datetime.now().strftime("%Y-%m-%d")
+        end = (datetime.now() + timedelta(days=HORIZON_DAYS)).strftime("%Y-%m-%d")
+        timeline = self.cache.get_or_fetch(
+            "weather", key, lambda: self._fetch_timeline(key, start, end), ttl=FORECAST_TTL
+        )
+        expires_at = self.cache.expires_at("weather", key) or time.time() + FORECAST_TTL
+        self._remember(key, timeline, expires_at)
+        return timeline
+
+    def _remember(self, key, timeline, expires_at):
+        """
+        Stores a timeline in the in-memory LRU cache until `expires_at` (time.time() seconds).
+        """
+        with self.lock:
+            self.timelines[key] = (expires_at, timeline)
+            self.timelines.move_to_end(key)
+            while len(self.timelines) > MEMORY_CACHE_SIZE:
+                self.timelines.popitem(last=False)
+
+    @staticmethod
+    def _slice(timeline, date1, date2):
+        """
+        Returns conditions for every day from date1 to date2,
+        or None if any of those days is missing from the timeline.
+        """
+        day = datetime.strptime(date1, "%Y-%m-%d")
+        last = datetime.strptime(date2, "%Y-%m-%d")
+        conditions = []
+
+        while day <= last:
+            date = day.strftime("%Y-%m-%d")
+            if date not in timeline:
+                return None
+            conditions.append(timeline[date])
+            day += timedelta(days=1)
+
+        return conditions
+
+    def _fetch_timeline(self, location, date1, date2):
+        """
+        Requests daily conditions from the Visual Crossing API.
+        Returns a dict {date: conditions}.
+        """
         params = {
             "key": API_KEY,
             "maxStations": 1,
             "unitGroup": "metric",
             "include": "days",
-            "elements": "conditions"
+            "elements": "datetime,conditions"
         }
 
-        response = requests.get(
+        response = guarded("weather", lambda timeout: metrics.timed("weather", lambda: requests.get(
             url=f"{self.weather_endpoint}/{location}/{date1}/{date2}",
-            params=params
-        )
+            params=params,
+            timeout=timeout
+        )))
         response.raise_for_status()
         data = response.json()
 
         # Extract weather condition (e.g. "Clear", "Rain", "Overcast") for each day
-        for condition in data["days"]:
-            self.weather_conditions.append(condition["conditions"])
+        timeline = {day["datetime"]: day["conditions"] for day in data["days"]}
+
+        # Only the near-term days are recorded in the climatology (see RECORD_AHEAD_DAYS)
+        self.climatology.add(location, timeline)
+        return timeline
 
     def calculate_score(self):
         """
@@ -63,39 +206,17 @@ class Weather:
         Returns:
             float: Average weather score (rounded to 2 decimals)
         """
-        score_map = {
-            "thunder": 0,
-            "storm": 0,
-            "snow": 2,
-            "rain": 2,
-            "showers": 2,
-            "fog": 1,
-            "clear": 5,
-            "sunny": 5,
-            "cloud": 4,
-            "overcast": 4,
-        }
-
-        daily_scores = []
+        return self.score_conditions(self.weather_conditions)
 
-        for cond in self.weather_conditions:
-            cond_lower = cond.lower()
-            scores = []
-
-            # Match words from score_map to weather condition
-            for key, score in score_map.items():
-                if key in cond_lower:
-                    scores.append(score)
-
-            # If no keyword matched, assign neutral score (3)
-            if not scores:
-                daily_scores.append(3)
-            else:
-                # Take the lowest score if multiple conditions (e.g., "Rain and Clouds")
-                daily_scores.append(min(scores))
-
-        # Calculate average score for the period
-        return round(sum(daily_scores) / len(daily_scores), 2)
+    @staticmethod
+    def score_conditions(conditions):
+        """
+        Calculates the average weather score for a list of daily conditions
+        (same scoring as calculate_score). Does not use instance state,
+        so it is safe to call from many threads at once.
+        """
+        # Keyword scores and matching rules live in weather_scoring (shared with BatchScorer)
+        return average_score(conditions)
 
 
 
@@ -0,0 +1,130 @@
+import re
+import threading
+import numpy as np
+
+# Score for every weather keyword (same scoring as Weather.calculate_score):
+# - 5 → Excellent (clear/sunny)
+# - 4 → Good (cloudy/overcast)
+# - 3 → Neutral (unknown/other)
+# - 2 → Poor (rain/snow/showers)
+# - 1 → Bad (fog)
+# - 0 → Very bad (thunder/storm)
+SCORE_MAP = {
+    "thunder": 0,
+    "storm": 0,
+    "snow": 2,
+    "rain": 2,
+    "showers": 2,
+    "fog": 1,
+    "clear": 5,
+    "sunny": 5,
+    "cloud": 4,
+    "overcast": 4,
+}
+NEUTRAL_SCORE = 3
+MAX_SCORE = max(SCORE_MAP.values())
+
+# One precompiled pattern per score, from the worst to the best.
+# The first pattern that matches gives the lowest score of all matching keywords.
+_PATTERNS = [
+    (score, re.compile("|".join(re.escape(key) for key, value in SCORE_MAP.items() if value == score)))
+    for score in sorted(set(SCORE_MAP.values()))
+]
+
+# Condition strings repeat a lot ("Clear", "Partially cloudy", ...), so each one is scored once
+_day_scores = {}
+_day_scores_lock = threading.Lock()
+
+
+def day_score(condition):
+    """
+    Returns the score of one day's condition string (e.g. "Rain, Overcast" → 2).
+    """
+    score = _day_scores.get(condition)
+    if score is not None:
+        return score
+
+    cond_lower = condition.lower()
+    score = NEUTRAL_SCORE
+    for value, pattern in _PATTERNS:
+        if pattern.search(cond_lower):
+            score = value
+            break
+
+    with _day_scores_lock:
+        _day_scores[condition] = score
+    return score
+
+
+def average_score(conditions):
+    """
+    Average score for a list of daily conditions, rounded to 2 decimals.
+    """
+    daily_scores = [day_score(cond) for cond in conditions]
+    return round(sum(daily_scores) / len(daily_scores), 2)
+
+
+class BatchScorer:
+    """
+    Stateless scorer for many locations and windows at once.
+    Daily scores are small integers, so every window sum comes from one cumulative
+    sum, and the rounded averages are read from a lookup table. The results are
+    exactly the same as average_score for the same window.
+    """
+
+    def __init__(self):
+        # Rounded averages for every possible window sum: {window: array}
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    def day_scores(self, conditions):
+        """
+        Returns the daily scores for a list of conditions as a NumPy array.
+        """
+        return np.fromiter((day_score(cond) for cond in conditions), dtype=np.int16, count=len(conditions))
+
+    def window_scores(self, conditions, window):
+        """
+        Returns the average score of every `window`-day window in a timeline.
+        E.g. 15 days of conditions and window=7 → 9 scores
+        (windows starting on day 0, 1, ..., 8).
+        """
+        return self.multi_window_scores(conditions, [window])[window]
+
+    def multi_window_scores(self, conditions, windows):
+        """
+        Same as window_scores for several window lengths at once
+        (e.g. stays of 4, 6, 8 and 11 days), all from one cumulative sum.
+        Returns a dict {window: NumPy array of window scores}.
+        """
+        scores = self.day_scores(conditions)
+        sums = np.concatenate(([0], np.cumsum(scores, dtype=np.int64)))
+
+        result = {}
+        for window in windows:
+            if len(scores) < window:
+                result[window] = np.empty(0, dtype=np.float64)
+            else:
+                result[window] = self._table(window)[sums[window:] - sums[:-window]]
+        return result
+
+    def batch(self, timelines, window):
+        """
+        Scores many timelines at once.
+        - timelines: dict {key: list of daily conditions} (e.g. key = location)
+        - window: number of days in each window
+        Returns a dict {key: NumPy array of window scores}.
+        """
+        return {key: self.window_scores(conditions, window) for key, conditions in timelines.items()}
+
+    def _table(self, window):
+        """
+        Returns rounded averages for every window sum from 0 to window * MAX_SCORE.
+        Python's round() is used to match average_score exactly.
+        """
+        table = self.tables.get(window)
+        if table is None:
+            table = np.array([round(total / window, 2) for total in range(window * MAX_SCORE + 1)])
+            with self.lock:
+                self.tables[window] = table
+        return table
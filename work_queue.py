@@ -0,0 +1,354 @@
+# --- Sharded, resumable run over large sheets ---
+# Every destination from the sheet becomes a job in a local SQLite queue.
+# N worker processes claim jobs with a lease, save a checkpoint after every stage,
+# and share one Amadeus rate limit. If the run crashes (or is stopped), running it
+# again resumes where it stopped: finished jobs and finished stages are not repeated.
+# Usage: python work_queue.py --workers 4        (add --new to start a fresh run)
+
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import argparse
+import multiprocessing
+from datetime import datetime
+import config  # loads the .env file (once per process)
+
+QUEUE_DB = os.getenv("QUEUE_DB", "work_queue.sqlite")
+
+# A job whose worker stops renewing its lease for this long is given to another worker
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+
+
+class WorkQueue:
+    """
+    Job queue in SQLite, safe to use from many processes.
+    Job status: pending → leased → done (or failed after MAX_ATTEMPTS).
+    """
+
+    def __init__(self, path=QUEUE_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, created REAL, finished REAL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY, run_id INTEGER, row TEXT, status TEXT,"
+            " lease_owner TEXT, lease_until REAL, attempts INTEGER, checkpoint TEXT, error TEXT)"
+        )
+
+    # --- Runs ---
+
+    def open_run(self):
+        """
+        Returns the id of the unfinished run, or None if there is none.
+        """
+        row = self.conn.execute("SELECT id FROM runs WHERE finished IS NULL ORDER BY id DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def create_run(self, rows):
+        """
+        Creates a new run with one job per sheet row. Returns the run id.
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        cursor = self.conn.execute("INSERT INTO runs (created) VALUES (?)", (time.time(),))
+        run_id = cursor.lastrowid
+        self.conn.executemany(
+            "INSERT INTO jobs (run_id, row, status, attempts, checkpoint) VALUES (?, ?, 'pending', 0, '{}')",
+            [(run_id, json.dumps(row)) for row in rows]
+        )
+        self.conn.execute("COMMIT")
+        return run_id
+
+    def finish_run(self, run_id):
+        self.conn.execute("UPDATE runs SET finished = ? WHERE id = ?", (time.time(), run_id))
+
+    def counts(self, run_id):
+        """
+        Returns {status: number of jobs} for a run.
+        """
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM jobs WHERE run_id = ? GROUP BY status", (run_id,))
+        return dict(rows.fetchall())
+
+    # --- Jobs ---
+
+    def claim(self, run_id, owner):
+        """
+        Leases the next pending job (or one whose lease has expired).
+        Returns (job id, row, checkpoint) or None when nothing is left.
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        job = self.conn.execute(
+            "SELECT id, row, checkpoint FROM jobs WHERE run_id = ? AND"
+            " (status = 'pending' OR (status = 'leased' AND lease_until < ?)) ORDER BY id LIMIT 1",
+            (run_id, now)
+        ).fetchone()
+
+        if job is None:
+            self.conn.execute("COMMIT")
+            return None
+
+        self.conn.execute(
+            "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_until = ? WHERE id = ?",
+            (owner, now + LEASE_SECONDS, job[0])
+        )
+        self.conn.execute("COMMIT")
+        return job[0], json.loads(job[1]), json.loads(job[2])
+
+    def save_checkpoint(self, job_id, owner, checkpoint):
+        """
+        Stores the finished stages of a job and renews its lease.
+        """
+        self.conn.execute(
+            "UPDATE jobs SET checkpoint = ?, lease_until = ? WHERE id = ? AND lease_owner = ?",
+            (json.dumps(checkpoint), time.time() + LEASE_SECONDS, job_id, owner)
+        )
+
+    def renew(self, job_id, owner):
+        """
+        Extends the lease of a job that is still being worked on.
+        """
+        self.conn.execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND lease_owner = ?",
+            (time.time() + LEASE_SECONDS, job_id, owner)
+        )
+
+    def release(self, job_id, owner):
+        """
+        Gives a job back to the queue without counting an attempt (e.g. the worker was stopped).
+        """
+        self.conn.execute(
+            "UPDATE jobs SET status = 'pending', lease_owner = NULL WHERE id = ? AND lease_owner = ?",
+            (job_id, owner)
+        )
+
+    def release_dead(self, run_id):
+        """
+        Gives back the jobs leased by worker processes on this host that are not running anymore
+        (crashed or stopped), so a resumed run doesn't wait LEASE_SECONDS for them.
+        Returns the number of released jobs.
+        """
+        host = socket.gethostname()
+        self.conn.execute("BEGIN IMMEDIATE")
+        leases = self.conn.execute(
+            "SELECT id, lease_owner FROM jobs WHERE run_id = ? AND status = 'leased'", (run_id,)
+        ).fetchall()
+
+        released = 0
+        for job_id, owner in leases:
+            owner_host, _, pid = (owner or "").rpartition(":")
+            if owner_host == host and pid.isdigit() and not process_alive(int(pid)):
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'pending', lease_owner = NULL WHERE id = ?", (job_id,)
+                )
+                released += 1
+        self.conn.execute("COMMIT")
+        return released
+
+    def complete(self, job_id, owner):
+        self.conn.execute(
+            "UPDATE jobs SET status = 'done', lease_owner = NULL WHERE id = ? AND lease_owner = ?",
+            (job_id, owner)
+        )
+
+    def fail(self, job_id, owner, error):
+        """
+        Gives the job back to the queue, or marks it failed after MAX_ATTEMPTS.
+        """
+        self.conn.execute(
+            "UPDATE jobs SET attempts = attempts + 1, error = ?, lease_owner = NULL,"
+            " status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END"
+            " WHERE id = ? AND lease_owner = ?",
+            (str(error), MAX_ATTEMPTS, job_id, owner)
+        )
+
+
+def process_alive(pid):
+    """
+    True if a process with this pid is running on this machine.
+    """
+    if os.name == "nt":
+        import ctypes
+        # PROCESS_QUERY_LIMITED_INFORMATION; STILL_ACTIVE = 259
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        ctypes.windll.kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return code.value == 259
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Worker:
+    """
+    Runs jobs from the queue through the pipeline stages, one destination at a time,
+    saving a checkpoint after every stage.
+    """
+
+    def __init__(self, run_id, queue_path=QUEUE_DB):
+        # Project modules are imported here, in the worker process,
+        # after SHARED_RATE_DB is set (see start_workers)
+        from amadeus_flight_data import FlightData, ORIGINS
+        from weather_data import Weather
+        from hotel_data import Hotel
+        from notification import WhatsAppNotifier
+        from pipeline import Pipeline
+        from deal_digest import DealDigest
+        from price_archive import PriceArchive
+        from hotel_catalog import HotelCatalog
+        from date_planner import DatePlanner
+        from cli import SEARCH_DAYS, STAY_DAYS, MIN_SCORE, WEATHER_FIRST
+
+        self.run_id = run_id
+        self.queue = WorkQueue(queue_path)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.digest = DealDigest(WhatsAppNotifier())
+        self.archive = PriceArchive()
+        hotel = Hotel()
+        # A failed search raises (see Pipeline.search_day), so the job fails and is retried
+        # instead of being checkpointed as "no flight"
+        flight_data = FlightData()
+        weather = self.weather = Weather()
+
+        # Same search settings as `python cli.py run`
+        planner = None
+        if WEATHER_FIRST:
+            planner = DatePlanner(flight_data, weather, SEARCH_DAYS, STAY_DAYS, MIN_SCORE, origins=ORIGINS)
+
+        self.pipeline = Pipeline(flight_data, weather, hotel, self.digest,
+                                 days=SEARCH_DAYS, stay_days=STAY_DAYS, min_score=MIN_SCORE, planner=planner,
+                                 origins=ORIGINS, archive=self.archive, catalog=HotelCatalog(hotel))
+
+    def run(self):
+        """
+        Claims and processes jobs until the queue is empty.
+        """
+        while True:
+            job = self.queue.claim(self.run_id, self.owner)
+            if job is None:
+                break
+
+            job_id, row, checkpoint = job
+            try:
+                self.process(job_id, row, checkpoint)
+                self.queue.complete(job_id, self.owner)
+            except KeyboardInterrupt:
+                # Stopped by the user: the job is picked up again when the run is resumed
+                self.queue.release(job_id, self.owner)
+                raise
+            except Exception as e:
+                print(f"Job {job_id} ({row.get('city')}) failed: {e}")
+                self.queue.fail(job_id, self.owner, e)
+
+        self.digest.close()
+        self.archive.flush()
+        # Worker processes exit without running atexit handlers, so the climatology is saved here
+        # (merged with what the other workers saved, see Climatology.save)
+        self.weather.climatology.save()
+
+    def process(self, job_id, row, checkpoint):
+        """
+        Runs the stages that are not in the checkpoint yet.
+        """
+        pipeline = self.pipeline
+
+        def save(stage, value):
+            checkpoint[stage] = value
+            self.queue.save_checkpoint(job_id, self.owner, checkpoint)
+
+        def renewing(items):
+            # A stage can take longer than the lease, so it is renewed before every item
+            for item in items:
+                self.queue.renew(job_id, self.owner)
+                yield item
+
+        if "resolve" not in checkpoint:
+            queries = [
+                [origin, code, price, date.strftime("%Y-%m-%d")]
+                for origin, code, price, date in pipeline.resolve(row)
+            ]
+            save("resolve", queries)
+
+        if "flights" not in checkpoint:
+            flights = [
+                flight
+                for origin, code, price, date in renewing(checkpoint["resolve"])
+                for flight in pipeline.search((origin, code, price, datetime.strptime(date, "%Y-%m-%d")))
+            ]
+            save("flights", flights)
+
+        if "weather" not in checkpoint:
+            scored = [list(item) for flight in renewing(checkpoint["flights"]) for item in pipeline.score(flight)]
+            save("weather", scored)
+
+        if "hotels" not in checkpoint:
+            deals = [deal for item in renewing(checkpoint["weather"]) for deal in pipeline.find_hotel(tuple(item))]
+            save("hotels", deals)
+
+        if "notify" not in checkpoint:
+            # Already-sent deals are skipped by the digest, so repeating this stage is safe
+            for deal in checkpoint["hotels"]:
+                list(pipeline.notify(deal))
+            self.digest.flush().result()
+            save("notify", len(checkpoint["hotels"]))
+
+
+def worker_main(run_id, queue_path):
+    Worker(run_id, queue_path).run()
+
+
+def start_workers(run_id, workers, queue_path=QUEUE_DB):
+    """
+    Starts worker processes that share one Amadeus rate limit, and waits for them.
+    """
+    os.environ["SHARED_RATE_DB"] = os.path.abspath(os.getenv("SHARED_RATE_DB", "rate_limits.sqlite"))
+
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=worker_main, args=(run_id, queue_path)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the search as a resumable multi-worker job queue.")
+    parser.add_argument("--workers", type=int, default=4, help="number of worker processes")
+    parser.add_argument("--new", action="store_true", help="start a new run even if one is unfinished")
+    args = parser.parse_args()
+
+    queue = WorkQueue()
+    run_id = None if args.new else queue.open_run()
+
+    if run_id is None:
+        from google_sheet_data import SheetData
+        rows = SheetData().get_data()["flights"]
+        run_id = queue.create_run(rows)
+        print(f"Run {run_id}: {len(rows)} destinations queued.")
+    else:
+        released = queue.release_dead(run_id)
+        if released:
+            print(f"{released} job(s) of stopped workers given back to the queue.")
+        print(f"Resuming run {run_id}: {queue.counts(run_id)}")
+
+    start_workers(run_id, args.workers)
+
+    counts = queue.counts(run_id)
+    print(f"Run {run_id} finished: {counts}")
+    if not counts.get("pending") and not counts.get("leased"):
+        queue.finish_run(run_id)
+    else:
+        sys.exit(1)